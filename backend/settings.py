@@ -85,6 +85,20 @@ DATABASES = {
     }
 }
 
+# Caches serialized posts (see blog_api/post_cache.py). Entries are evicted on change, so any
+# backend works, e.g. 'django.core.cache.backends.filebased.FileBasedCache' with a directory as
+# LOCATION to share the cache between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'web2blog',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -122,6 +136,19 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Content-addressed store of uploaded image bytes (see blog_api/blobstore.py)
+IMAGE_STORAGE_ROOT = BASE_DIR / 'media' / 'images'
+
+# Largest accepted image upload in bytes (see blog_api/uploads.py)
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Cache of resized image variants (see blog_api/variants.py), bounded to IMAGE_VARIANT_CACHE_SIZE bytes
+IMAGE_VARIANT_ROOT = BASE_DIR / 'media' / 'variants'
+IMAGE_VARIANT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Threads processing images with Pillow
+IMAGE_WORKERS = 4
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlogApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog_api'
+
+    def ready(self):
+        # Connects the cache invalidation receivers
+        from blog_api import post_cache  # noqa: F401
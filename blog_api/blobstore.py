@@ -0,0 +1,75 @@
+"""
+Content-addressed store for image bytes on the filesystem, under `settings.IMAGE_STORAGE_ROOT`.
+
+Blobs are named after the SHA-256 of their content and sharded into two levels of directories,
+e.g. `ab/cd/abcd…`, so that no directory grows too large. Identical content is stored once.
+"""
+import hashlib
+import os
+import tempfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from django.conf import settings
+
+
+def _root() -> Path:
+    return Path(settings.IMAGE_STORAGE_ROOT)
+
+
+def blob_path(sha256: str) -> Path:
+    return _root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def _temp_dir() -> Path:
+    return _root() / "tmp"
+
+
+def write_blob(chunks: Iterable[bytes]) -> tuple[str, int]:
+    """
+    Stores the blob made of `chunks`, hashing it while it is written, and returns its SHA-256 and size.
+    The blob is written to a temporary file first and atomically moved to its final path.
+    """
+    temp_dir = _temp_dir()
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    return sha256, size
+
+
+def open_blob(sha256: str) -> BinaryIO:
+    """Opens the blob for reading, a real file so responses can be sent with `sendfile`"""
+    return blob_path(sha256).open("rb")
+
+
+def delete_blob(sha256: str):
+    blob_path(sha256).unlink(missing_ok=True)
+
+
+def stored_files() -> Iterator[Path]:
+    """All blobs in the store, and the temporary files of writes which did not complete"""
+    if not _root().exists():
+        return
+    for path in _root().glob("*/*/*"):
+        if path.is_file():
+            yield path
+    if _temp_dir().exists():
+        yield from _temp_dir().iterdir()
@@ -0,0 +1,27 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag of a representation identified by `parts`, e.g. the object id, its version
+    and the versions of the related objects it embeds. Representations that differ per viewer
+    must include the viewer in `parts`.
+    """
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def not_modified(request, etag: str) -> HttpResponse | None:
+    """Returns `304 Not Modified` if the client's `If-None-Match` matches `etag`, otherwise `None`"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def viewer_key(request):
+    """Distinguishes representations containing the viewer's like/bookmark flags"""
+    return request.user.id if request.user.is_authenticated else None
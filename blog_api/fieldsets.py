@@ -0,0 +1,116 @@
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+
+# Documents the query parameters read by `FieldSet.from_request`
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields", str,
+        description="Comma-separated fields to return, nested fields separated by dots. Example: id,title,profile.user.username,like_count"
+    ),
+    OpenApiParameter(
+        "exclude", str,
+        description="Comma-separated fields to leave out, nested fields separated by dots. Example: content,profile.post_ids"
+    ),
+]
+
+
+def _parse(value: str) -> dict:
+    """`"id,profile.user.username"` -> `{"id": {}, "profile": {"user": {"username": {}}}}`"""
+    tree: dict = {}
+    for path in value.split(","):
+        if not path.strip():
+            continue
+        node = tree
+        for name in path.strip().split("."):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _nested_serializer(field) -> serializers.Serializer | None:
+    field = getattr(field, "child", field)
+    return field if isinstance(field, serializers.Serializer) else None
+
+
+class FieldSet:
+    """
+    Fields of a representation selected with the `fields` and `exclude` query parameters.
+
+    Both take comma-separated field names, nested fields are addressed with dots, e.g.
+    `fields=id,title,profile.user.username` or `exclude=content,profile.post_ids`.
+    Selecting a nested serializer by name selects all of its fields.
+    """
+
+    def __init__(self, fields: str | None = None, exclude: str | None = None, *, include_tree=None, exclude_tree=None):
+        self.include = _parse(fields) if fields else include_tree
+        self.exclude = _parse(exclude) if exclude else (exclude_tree or {})
+
+    @classmethod
+    def from_request(cls, request, serializer_class: type[serializers.Serializer]) -> "FieldSet":
+        """
+        Reads the selection from the query parameters of `request` and validates it against `serializer_class`.
+        Raises `ValidationError` for unknown fields.
+        """
+        fieldset = cls(request.query_params.get("fields"), request.query_params.get("exclude"))
+        fieldset.prune(serializer_class())
+        return fieldset
+
+    def __bool__(self):
+        return self.include is not None or bool(self.exclude)
+
+    def __repr__(self):
+        return f"FieldSet(include={self.include!r}, exclude={self.exclude!r})"
+
+    def includes(self, path: str) -> bool:
+        """Whether the field at the dotted `path` is part of the representation"""
+        include, exclude = self.include, self.exclude
+        for name in path.split("."):
+            if include is not None:
+                if name not in include:
+                    return False
+                include = include[name] or None
+            if name in exclude and not exclude[name]:
+                return False
+            exclude = exclude.get(name, {})
+        return True
+
+    def nested(self, name: str) -> "FieldSet":
+        """Selection of the fields of the nested representation `name`"""
+        include = None if self.include is None else (self.include.get(name) or None)
+        return FieldSet(include_tree=include, exclude_tree=self.exclude.get(name, {}))
+
+    def prune(self, serializer: serializers.BaseSerializer) -> serializers.BaseSerializer:
+        """
+        Removes the fields which are not selected from `serializer` and its nested serializers,
+        so they are neither read from the instances nor rendered. Returns `serializer`.
+        """
+        target = _nested_serializer(serializer)
+        if target is None or not self:
+            return serializer
+
+        unknown = set(self.include or {}).union(self.exclude) - set(target.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": [f"Unknown field: {name}" for name in sorted(unknown)]})
+
+        for name in list(target.fields):
+            if not self.includes(name):
+                target.fields.pop(name)
+                continue
+            nested = self.nested(name)
+            if nested:
+                if _nested_serializer(target.fields[name]) is None:
+                    raise serializers.ValidationError({"fields": [f"Field has no nested fields: {name}"]})
+                nested.prune(target.fields[name])
+        return serializer
+
+    def apply(self, data):
+        """Removes the fields which are not selected from already serialized `data`"""
+        if isinstance(data, list):
+            return [self.apply(item) for item in data]
+        if not isinstance(data, dict) or not self:
+            return data
+        return {name: self.nested(name).apply(value) for name, value in data.items() if self.includes(name)}
+
+    def cache_key(self) -> tuple:
+        """Identifies the selection, e.g. in ETags"""
+        return repr(self.include), repr(self.exclude)
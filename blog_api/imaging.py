@@ -0,0 +1,156 @@
+"""
+Image operations with Pillow, run in a bounded pool of worker threads.
+
+Pillow releases the GIL while decoding, resizing and encoding, so the workers run in parallel,
+and the pool bounds how much image processing happens at the same time however many requests ask for it.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import BinaryIO
+
+from django.conf import settings
+from PIL import ExifTags, Image as PILImage, ImageOps, features
+
+# Pillow formats of the image types which can be processed, SVG images are not raster images
+PIL_FORMATS = {"PNG": "PNG", "JPEG": "JPEG"}
+
+# Formats which images are converted to for clients accepting them, in order of preference,
+# as far as the Pillow build can encode them
+DERIVATIVE_FORMATS = [format for format in ("AVIF", "WEBP") if features.check(format.lower())]
+
+ENCODE_OPTIONS = {
+    "PNG": {"optimize": True},
+    "JPEG": {"optimize": True},
+    "WEBP": {"quality": 80, "method": 6},
+    "AVIF": {"quality": 60},
+}
+
+# Raised by Pillow for data it cannot decode
+DECODE_ERRORS = (OSError, SyntaxError, ValueError, PILImage.DecompressionBombError)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """The pool of `settings.IMAGE_WORKERS` threads processing images"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image")
+        return _executor
+
+
+def load(source: BinaryIO) -> PILImage.Image:
+    """Decodes the image read from `source`, rotated according to its EXIF orientation"""
+    with source, PILImage.open(source) as original:
+        return ImageOps.exif_transpose(original)
+
+
+def scale(image: PILImage.Image, width: int | None, height: int | None, fit: str) -> PILImage.Image:
+    """
+    Scales `image` down to `width` x `height`. With `fit="contain"` it fits within the box keeping its
+    aspect ratio, a missing dimension is unbounded, with `fit="cover"` it fills the box and is cropped
+    around its center. Images are never scaled up.
+    """
+    if fit == "cover" and width and height:
+        scale = min(1, image.width / width, image.height / height)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return ImageOps.fit(image, size, PILImage.Resampling.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width or image.width, height or image.height), PILImage.Resampling.LANCZOS)
+    return image
+
+
+def encode(image: PILImage.Image, format: str) -> bytes:
+    """Encodes `image` in `format`, an image type or one of `DERIVATIVE_FORMATS`"""
+    if format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = BytesIO()
+    image.save(output, format=format, **ENCODE_OPTIONS[format])
+    return output.getvalue()
+
+
+def optimize(source: BinaryIO, type: str) -> tuple[int, int, bytes | None]:
+    """
+    Decodes the image read from `source`, which must be of `type`, and returns its width and height as
+    displayed and its bytes without metadata, or `None` if it has none or cannot be optimized without losing
+    content. PNGs are recompressed losslessly, JPEGs are never re-encoded, see `strip_jpeg`.
+    """
+    with source:
+        data = source.read()
+    with PILImage.open(BytesIO(data), formats=[PIL_FORMATS[type]]) as image:
+        image.load()
+        if getattr(image, "is_animated", False):
+            return image.width, image.height, None
+
+        if type == "JPEG":
+            orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+            if orientation not in range(1, 9):
+                orientation = 1
+            # Orientations 5 to 8 turn the image by a quarter
+            width, height = (image.height, image.width) if orientation >= 5 else image.size
+            return width, height, strip_jpeg(data, orientation)
+
+        output = BytesIO()
+        options = {"optimize": True}
+        for key in ("icc_profile", "transparency"):
+            if key in image.info:
+                options[key] = image.info[key]
+        image.save(output, format="PNG", **options)
+        return image.width, image.height, output.getvalue()
+
+
+# Application segments which change how the pixels are decoded, by their marker and the prefix of their data:
+# the JFIF header, the color profile and the Adobe color transform
+JPEG_DECODING_SEGMENTS = {0xE0: b"", 0xE2: b"ICC_PROFILE\x00", 0xEE: b"Adobe"}
+
+
+def strip_jpeg(data: bytes, orientation: int = 1) -> bytes | None:
+    """
+    Removes the metadata of the JPEG `data` without decoding it: the application segments other than
+    `JPEG_DECODING_SEGMENTS`, comments and anything after the end of the image. An EXIF segment holding only
+    `orientation` is added unless it is 1. The compressed pixels are copied unchanged, so the result is never
+    larger and looks the same. Returns `None` if there is nothing to remove.
+    """
+    segments = [data[:2]]
+    if orientation != 1:
+        exif = PILImage.Exif()
+        exif[ExifTags.Base.Orientation] = orientation
+        payload = exif.tobytes()
+        segments.append(b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload)
+
+    position = 2
+    while position < len(data):
+        if data[position] != 0xFF:
+            raise ValueError(f"No JPEG marker at {position}")
+        # Markers may be preceded by fill bytes
+        while data[position + 1:position + 2] == b"\xff":
+            position += 1
+        marker = data[position + 1]
+        if marker == 0xD9:
+            segments.append(data[position:position + 2])
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            segments.append(data[position:position + 2])
+            position += 2
+            continue
+
+        end = position + 2 + int.from_bytes(data[position + 2:position + 4], "big")
+        if end > len(data) or end < position + 4:
+            raise ValueError(f"Truncated JPEG segment at {position}")
+        if marker == 0xDA:
+            # The compressed scans with their tables and restart markers, up to the end of the image marker,
+            # which cannot occur within them as their 0xFF bytes are followed by 0x00
+            eoi = data.find(b"\xff\xd9", end)
+            segments.append(data[position:eoi + 2 if eoi >= 0 else len(data)])
+            break
+        prefix = JPEG_DECODING_SEGMENTS.get(marker)
+        metadata = 0xE0 <= marker <= 0xEF or marker == 0xFE
+        if not metadata or (prefix is not None and data[position + 4:end].startswith(prefix)):
+            segments.append(data[position:end])
+        position = end
+
+    stripped = b"".join(segments)
+    return stripped if stripped != data else None
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blog_api.models import Post, summarize_content
+
+BATCH_SIZE = 1000
+SUMMARY_FIELDS = ['excerpt', 'word_count', 'reading_time']
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored excerpts, word counts and reading times of all posts from their content'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'content', *SUMMARY_FIELDS)
+        batch = []
+        updated = 0
+        for post in posts.iterator(chunk_size=BATCH_SIZE):
+            summary = summarize_content(post.content)
+            if summary == tuple(getattr(post, field) for field in SUMMARY_FIELDS):
+                continue
+            post.excerpt, post.word_count, post.reading_time = summary
+            batch.append(post)
+            if len(batch) == BATCH_SIZE:
+                updated += self._save(batch)
+        updated += self._save(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated the excerpts of {updated} posts'))
+
+    def _save(self, batch: list[Post]) -> int:
+        Post.objects.bulk_update(batch, SUMMARY_FIELDS)
+        # The summaries are part of the serialized posts, invalidate their ETags
+        Post.objects.filter(pk__in=[post.pk for post in batch]).update(version=F('version') + 1)
+        count = len(batch)
+        batch.clear()
+        return count
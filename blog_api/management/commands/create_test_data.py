@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from blog_api.models import Profile, Post, Hashtag, Comment, Like, Bookmark, Image
@@ -77,10 +78,7 @@ class Command(BaseCommand):
                             continue
                         
                         # Create image object
-                        image_obj = Image.objects.create(
-                            type=img_type,
-                            data=image_data
-                        )
+                        image_obj = Image.objects.store(img_type, [image_data])
                         
                         # Map filename to image object for later use
                         image_mapping[filename] = image_obj
@@ -856,6 +854,10 @@ Choose the approach that best fits your project’s needs.''',
                     defaults={'title': random.choice(bookmark_titles)}
                 )
 
+        # Likes, comments and bookmarks were created directly, update the post counters
+        call_command('recount_engagement', stdout=self.stdout)
+        call_command('refresh_hot_scores', stdout=self.stdout)
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully created test data:\n'
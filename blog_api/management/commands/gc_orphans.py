@@ -0,0 +1,96 @@
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Sum
+from django.utils import timezone
+
+from blog_api import blobstore
+from blog_api.models import Hashtag, Image, Post
+
+# Rows deleted per transaction, so the SQLite write lock is only held briefly
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Delete images no post or profile uses, hashtags no post uses and blobs no image uses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Only delete images and blobs older than this, e.g. uploads for drafts still being written'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        grace_period = timedelta(hours=options['grace_hours'])
+        dry_run = options['dry_run']
+
+        images = Image.objects.unreferenced().filter(created_at__lt=timezone.now() - grace_period)
+        hashtags = Hashtag.objects.filter(~Exists(Post.tags.through.objects.filter(hashtag_id=OuterRef('pk'))))
+
+        stray_blobs = self._stray_blobs(grace_period)
+        stray_bytes = sum(path.stat().st_size for path in stray_blobs)
+
+        if dry_run:
+            image_bytes = images.aggregate(size=Sum('size'))['size'] or 0
+            self.stdout.write(
+                f'Would delete {images.count()} images, {hashtags.count()} hashtags '
+                f'and {len(stray_blobs)} stray blobs, '
+                f'reclaiming {image_bytes + stray_bytes} bytes'
+            )
+            return
+
+        image_count = image_bytes = 0
+        while batch := list(images.values_list('id', 'sha256', 'size')[:BATCH_SIZE]):
+            with transaction.atomic():
+                # Checked again while deleting, the images may have been used since they were selected
+                deleted_ids = set(
+                    images.filter(pk__in=[image_id for image_id, _, _ in batch]).values_list('id', flat=True)
+                )
+                Image.objects.filter(pk__in=deleted_ids).delete()
+            image_count += len(deleted_ids)
+            for image_id, sha256, size in batch:
+                # Identical content of another type shares the blob
+                if image_id not in deleted_ids or sha256 and Image.objects.filter(sha256=sha256).exists():
+                    continue
+                if sha256:
+                    blobstore.delete_blob(sha256)
+                image_bytes += size
+
+        hashtag_count = 0
+        while batch := list(hashtags.values_list('id', flat=True)[:BATCH_SIZE]):
+            with transaction.atomic():
+                deleted, _ = hashtags.filter(pk__in=batch).delete()
+            hashtag_count += deleted
+
+        cutoff = time.time() - grace_period.total_seconds()
+        for path in stray_blobs:
+            # Uploading the same content again rewrites the blob, which makes it recent
+            if path.exists() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {image_count} images, {hashtag_count} hashtags and {len(stray_blobs)} stray blobs, '
+            f'reclaimed {image_bytes + stray_bytes} bytes'
+        ))
+
+    def _stray_blobs(self, grace_period: timedelta) -> list[Path]:
+        """Blobs and temporary files no image refers to, e.g. left by interrupted uploads"""
+        cutoff = time.time() - grace_period.total_seconds()
+        paths = [path for path in blobstore.stored_files() if path.stat().st_mtime < cutoff]
+        stray = []
+        for start in range(0, len(paths), BATCH_SIZE):
+            batch = paths[start:start + BATCH_SIZE]
+            names = [path.name for path in batch]
+            used = set(Image.objects.filter(sha256__in=names).values_list('sha256', flat=True))
+            stray += [path for path in batch if path.name not in used]
+        return stray
@@ -0,0 +1,36 @@
+import hashlib
+
+from django.core.management.base import BaseCommand
+
+from blog_api.models import Image
+from blog_api.uploads import read_chunks
+
+
+class Command(BaseCommand):
+    help = 'Merge images with identical content and type, pointing posts and profiles to the image that is kept'
+
+    def handle(self, *args, **options):
+        # Images in the blob store are unique by their hash, so duplicates only involve images still in the database
+        kept = {
+            (sha256, type): image_id
+            for image_id, sha256, type in Image.objects.exclude(sha256='').values_list('id', 'sha256', 'type')
+        }
+        ids = list(Image.objects.filter(sha256='', data__isnull=False).order_by('id').values_list('id', flat=True))
+
+        merged = 0
+        freed_bytes = 0
+        for image_id in ids:
+            # Hashed in chunks, without loading the whole blob
+            image = Image.objects.get(pk=image_id)
+            digest = hashlib.sha256()
+            with image.open() as file:
+                for chunk in read_chunks(file):
+                    digest.update(chunk)
+            key = (digest.hexdigest(), image.type)
+            if key not in kept:
+                kept[key] = image_id
+                continue
+            merged += Image.objects.filter(pk=image_id).merge_into(Image(pk=kept[key]))
+            freed_bytes += image.size
+
+        self.stdout.write(self.style.SUCCESS(f'Merged {merged} duplicate images ({freed_bytes} bytes)'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog_api import blobstore
+from blog_api.uploads import read_chunks
+from blog_api.models import Image
+
+
+class Command(BaseCommand):
+    help = 'Move the bytes of images still stored in the database to the content-addressed blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Run VACUUM afterwards so SQLite returns the freed space to the filesystem'
+        )
+
+    def handle(self, *args, **options):
+        ids = list(Image.objects.filter(sha256='', data__isnull=False).values_list('id', flat=True))
+        moved_bytes = 0
+        merged = 0
+        for image_id in ids:
+            # Copied in chunks, without loading the whole blob
+            image = Image.objects.get(pk=image_id)
+            with image.open() as file:
+                sha256, size = blobstore.write_blob(read_chunks(file))
+            existing = Image.objects.filter(sha256=sha256, type=image.type).first()
+            if existing is not None:
+                # The same content was uploaded again after the blob store was introduced
+                merged += Image.objects.filter(pk=image_id).merge_into(existing)
+            else:
+                Image.objects.filter(pk=image_id).update(sha256=sha256, size=size, data=None)
+            moved_bytes += size
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(ids)} images ({moved_bytes} bytes) to the blob store, {merged} of them merged into identical images'
+        ))
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write('Vacuumed the database')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from blog_api import processing
+from blog_api.models import Image
+
+
+class Command(BaseCommand):
+    help = 'Verify and optimize the images which were not processed in the background, e.g. because the server stopped'
+
+    def handle(self, *args, **options):
+        # Images still stored in the database are processed once they were moved by `move_image_blobs`
+        images = Image.objects.filter(processed=False).exclude(sha256='')
+        ids = list(images.values_list('id', flat=True))
+        size_before = images.aggregate(size=Sum('size'))['size'] or 0
+
+        for image_id in ids:
+            processing.process_image(image_id)
+
+        size_after = Image.objects.filter(pk__in=ids).aggregate(size=Sum('size'))['size'] or 0
+        invalid = Image.objects.filter(pk__in=ids, valid=False).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(ids)} images, {size_before - size_after} bytes saved, {invalid} do not decode'
+        ))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog_api.models import Post, HOT_SCORE_WEIGHTS
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Recount the like, comment and bookmark counters of all posts and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report posts with wrong counters, do not update them'
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(Post.objects.with_counter_drift())
+
+        for post in drifted:
+            self.stdout.write(
+                f'Post {post.id}: '
+                f'likes {post.like_count} -> {post.actual_like_count}, '
+                f'comments {post.comment_count} -> {post.actual_comment_count}, '
+                f'bookmarks {post.bookmark_count} -> {post.actual_bookmark_count}'
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} posts have wrong counters')
+            return
+
+        now = timezone.now()
+        ids = [post.pk for post in drifted]
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            Post.objects.filter(pk__in=batch).recount_engagement()
+            # The hot scores were computed from the wrong counters
+            posts = list(Post.objects.filter(pk__in=batch).only('id', 'draft', 'published_at', *HOT_SCORE_WEIGHTS))
+            for post in posts:
+                post.hot_score = post.compute_hot_score(now)
+            Post.objects.bulk_update(posts, ['hot_score'])
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters of {len(drifted)} posts'))
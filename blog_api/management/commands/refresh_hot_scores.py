@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog_api.models import Post, HOT_SCORE_WEIGHTS
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Recompute the time-decayed hot scores of recent posts, run periodically (e.g. hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Posts published longer ago drop out of the hot ranking and get a score of 0 (default: 7)'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['days'])
+
+        expired = Post.objects.filter(published_at__lt=cutoff, hot_score__gt=0).update(hot_score=0)
+
+        recent = Post.objects.filter(draft=False, published_at__gte=cutoff) \
+            .only('id', 'draft', 'published_at', *HOT_SCORE_WEIGHTS)
+        batch = []
+        refreshed = 0
+        for post in recent.iterator(chunk_size=BATCH_SIZE):
+            post.hot_score = post.compute_hot_score(now)
+            batch.append(post)
+            if len(batch) == BATCH_SIZE:
+                refreshed += self._save(batch)
+        refreshed += self._save(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed hot scores of {refreshed} posts, {expired} older posts dropped out'
+        ))
+
+    def _save(self, batch: list[Post]) -> int:
+        Post.objects.bulk_update(batch, ['hot_score'])
+        count = len(batch)
+        batch.clear()
+        return count
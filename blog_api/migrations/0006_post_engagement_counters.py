@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_engagement(apps, schema_editor):
+    Post = apps.get_model('blog_api', 'Post')
+
+    def count_per_post(model_name):
+        model = apps.get_model('blog_api', model_name)
+        counts = model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(count=Count('pk'))
+        return Coalesce(Subquery(counts.values('count')), 0)
+
+    Post.objects.update(
+        like_count=count_per_post('Like'),
+        comment_count=count_per_post('Comment'),
+        bookmark_count=count_per_post('Bookmark'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0005_bookmark_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='bookmark_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['draft', '-like_count', '-id'], name='blog_api_post_likes_idx'),
+        ),
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:56
+
+import blog_api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# External content FTS5 table over blog_api_post, the trigram tokenizer allows
+# case-insensitive substring matches like the previous `icontains` filters
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE blog_api_post_fts USING fts5(
+        title, content, content='blog_api_post', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER blog_api_post_fts_insert AFTER INSERT ON blog_api_post BEGIN
+        INSERT INTO blog_api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_api_post_fts_delete AFTER DELETE ON blog_api_post BEGIN
+        INSERT INTO blog_api_post_fts(blog_api_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_api_post_fts_update AFTER UPDATE OF title, content ON blog_api_post BEGIN
+        INSERT INTO blog_api_post_fts(blog_api_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO blog_api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO blog_api_post_fts(blog_api_post_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS blog_api_post_fts_update",
+    "DROP TRIGGER IF EXISTS blog_api_post_fts_delete",
+    "DROP TRIGGER IF EXISTS blog_api_post_fts_insert",
+    "DROP TABLE IF EXISTS blog_api_post_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases fall back to substring filters, see PostQuerySet.search
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0006_post_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='blog_api.post')),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+                ('document', blog_api.models.SearchDocumentField(db_column='blog_api_post_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'blog_api_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
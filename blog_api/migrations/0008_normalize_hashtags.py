@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:04
+
+from django.db import migrations
+
+
+def normalize_hashtags(apps, schema_editor):
+    Hashtag = apps.get_model('blog_api', 'Hashtag')
+    PostTags = apps.get_model('blog_api', 'Post').tags.through
+
+    canonical = {}
+    for hashtag in Hashtag.objects.order_by('id'):
+        value = hashtag.value.lower()
+        if value not in canonical:
+            canonical[value] = hashtag
+            continue
+
+        # Merge case variants into the oldest hashtag, posts tagged with both keep one tag
+        target = canonical[value]
+        tagged = PostTags.objects.filter(hashtag_id=target.id).values('post_id')
+        PostTags.objects.filter(hashtag_id=hashtag.id).exclude(post_id__in=tagged).update(hashtag_id=target.id)
+        hashtag.delete()
+
+    for value, hashtag in canonical.items():
+        if hashtag.value != value:
+            hashtag.value = value
+            hashtag.save(update_fields=['value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0007_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_hashtags, migrations.RunPython.noop),
+        # Covering index for looking up posts by tag, the implicit unique index starts with post_id
+        migrations.RunSQL(
+            'CREATE INDEX blog_api_post_tags_hashtag_post_idx ON blog_api_post_tags (hashtag_id, post_id)',
+            'DROP INDEX blog_api_post_tags_hashtag_post_idx',
+        ),
+    ]
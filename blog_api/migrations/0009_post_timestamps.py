@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:08
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_published_at(apps, schema_editor):
+    # The actual publication dates are unknown, existing posts keep their id order
+    # through the id tie-breaker of the date sort
+    Post = apps.get_model('blog_api', 'Post')
+    Post.objects.filter(draft=False).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0008_normalize_hashtags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['draft', '-published_at', '-id'], name='blog_api_post_published_idx'),
+        ),
+        migrations.RunPython(set_published_at, migrations.RunPython.noop),
+    ]
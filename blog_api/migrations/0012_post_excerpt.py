@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:35
+
+import html
+import math
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# Copied from `blog_api.models` as it was when the fields were added, so later changes do not alter the migration
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+BATCH_SIZE = 500
+
+
+def summarize_content(content):
+    text = " ".join(html.unescape(strip_tags(content)).split())
+    word_count = len(text.split())
+    reading_time = math.ceil(word_count / WORDS_PER_MINUTE)
+    return Truncator(text).chars(EXCERPT_LENGTH), word_count, reading_time
+
+
+def summarize_posts(apps, schema_editor):
+    Post = apps.get_model('blog_api', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'content').iterator(chunk_size=BATCH_SIZE):
+        post.excerpt, post.word_count, post.reading_time = summarize_content(post.content)
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+            batch.clear()
+    Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0011_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(summarize_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def measure_images(apps, schema_editor):
+    Image = apps.get_model('blog_api', 'Image')
+    Image.objects.update(size=Length('data'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0012_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(measure_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:55
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_images(apps, schema_editor):
+    Image = apps.get_model('blog_api', 'Image')
+    Post = apps.get_model('blog_api', 'Post')
+    Profile = apps.get_model('blog_api', 'Profile')
+    groups = (
+        Image.objects.exclude(sha256='').values('sha256', 'type')
+        .annotate(count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    )
+    for group in groups:
+        duplicates = Image.objects.filter(sha256=group['sha256'], type=group['type']).exclude(pk=group['keep_id'])
+        Post.objects.filter(image__in=duplicates).update(image_id=group['keep_id'], version=F('version') + 1)
+        Profile.objects.filter(profile_picture__in=duplicates).update(
+            profile_picture_id=group['keep_id'], version=F('version') + 1
+        )
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0013_image_blob_store'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='image',
+            constraint=models.UniqueConstraint(models.F('sha256'), models.F('type'), condition=models.Q(('sha256', ''), _negated=True), name='blog_api_unique_image_content'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_api', '0017_comment_post_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_api_post_likes_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_api_post_published_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_api_post_hot_idx',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['-like_count', '-id'], name='blog_api_post_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['-published_at', '-id'], name='blog_api_post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['-hot_score', '-id'], name='blog_api_post_hot_idx'),
+        ),
+    ]
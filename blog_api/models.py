@@ -1,8 +1,112 @@
-from django.db import models
+import functools
+import html
+import io
+import math
+import sqlite3
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import BinaryIO
+
+from django.db import connections, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from django.db.models.base import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate
 from django.dispatch import receiver
 
+from blog_api import blobstore
+from blog_api.fieldsets import FieldSet
+
+class ImageQuerySet(models.QuerySet):
+    def store(self, type: str, chunks: Iterable[bytes]) -> "Image":
+        """
+        Writes the image bytes given as `chunks` to the blob store and creates the image,
+        or returns the existing image with the same content and type
+        """
+        sha256, size = blobstore.write_blob(chunks)
+        # Also matches images whose uploaded bytes were replaced with optimized ones by `blog_api.processing`
+        existing = self.filter(Q(sha256=sha256) | Q(original_sha256=sha256), type=type).first()
+        if existing is not None:
+            if existing.sha256 != sha256 and not self.filter(sha256=sha256).exists():
+                blobstore.delete_blob(sha256)
+            return existing
+        # Concurrent uploads of the same content are resolved by the unique constraint
+        image, _ = self.get_or_create(sha256=sha256, type=type, defaults={"size": size})
+        return image
+
+    def unreferenced(self) -> "ImageQuerySet":
+        """Images which are neither the image of a post, including drafts, nor a profile picture"""
+        return self.filter(
+            ~Exists(Post.objects.filter(image=OuterRef("pk"))),
+            ~Exists(Profile.objects.filter(profile_picture=OuterRef("pk"))),
+        )
+
+    def merge_into(self, image: "Image") -> int:
+        """
+        Deletes the images of this queryset, duplicates of `image`, after pointing the posts and
+        profiles using them to `image`. Returns the number of deleted images.
+        """
+        duplicates = self.exclude(pk=image.pk)
+        with transaction.atomic():
+            Post.objects.filter(image__in=duplicates).update(image=image, version=F("version") + 1)
+            Profile.objects.filter(profile_picture__in=duplicates).update(
+                profile_picture=image, version=F("version") + 1
+            )
+            deleted, _ = duplicates.delete()
+        return deleted
+
+class SQLiteBlobReader(io.RawIOBase):
+    """
+    File object reading a BLOB value incrementally with SQLite's blob I/O, without loading the whole value.
+
+    The blob is only open while a chunk is read: an open blob keeps a read transaction, which in the
+    rollback journal mode blocks every writer for as long as a slow client takes to download the image.
+    Raises `sqlite3.OperationalError` if the value is NULL.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, table: str, column: str, rowid: int):
+        super().__init__()
+        self._open_blob = functools.partial(connection.blobopen, table, column, rowid, readonly=True)
+        with self._open_blob() as blob:
+            self._size = len(blob)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self._size - self._position)
+        if length <= 0:
+            return 0
+        with self._open_blob() as blob:
+            blob.seek(self._position)
+            data = blob.read(length)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        origin = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence]
+        if origin + offset < 0:
+            raise ValueError("negative seek position")
+        self._position = origin + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+class ImageManager(models.Manager.from_queryset(ImageQuerySet)):
+    def get_queryset(self):
+        # Bytes still stored in the database are only loaded when accessed, and `Image.open` reads them incrementally
+        return super().get_queryset().defer("data")
+
 class Image(models.Model):
     class ImageType(models.TextChoices):
         PNG = "PNG"
@@ -10,12 +114,91 @@ class Image(models.Model):
         SVG = "SVG"
 
     type = models.CharField(max_length=4, choices=ImageType.choices)
-    data = models.BinaryField()
+    # The bytes are kept in the blob store under their hash, see `blog_api.blobstore`
+    sha256 = models.CharField(max_length=64, blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # Hash of the bytes as uploaded, once they were replaced with optimized bytes
+    original_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # Recorded once the image was verified and optimized in the background, see `blog_api.processing`
+    processed = models.BooleanField(default=False)
+    # False once processing found that the bytes do not decode as `type`, such images are served as uploaded
+    valid = models.BooleanField(default=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Only images uploaded before the blob store, until they are moved out by `move_image_blobs`
+    data = models.BinaryField(null=True, blank=True)
+
+    objects = ImageManager()
+
+    class Meta:
+        # Identical uploads share one image, images still stored in the database have no hash
+        constraints = [models.UniqueConstraint(
+            "sha256",
+            "type",
+            condition=~Q(sha256=""),
+            name="blog_api_unique_image_content"
+        )]
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.type}"
+
+    def save(self, *args, **kwargs):
+        if not self.sha256 and "data" not in self.get_deferred_fields() and self.data is not None:
+            self.size = len(self.data)
+        super().save(*args, **kwargs)
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the image bytes for reading. Bytes still stored in SQLite, unless they were already loaded,
+        are read incrementally with its blob I/O, other databases load the whole value on access.
+        """
+        if self.sha256:
+            return blobstore.open_blob(self.sha256)
+        connection = connections[self._state.db or "default"]
+        if "data" in self.get_deferred_fields() and connection.vendor == "sqlite":
+            connection.ensure_connection()
+            try:
+                return SQLiteBlobReader(connection.connection, self._meta.db_table, "data", self.pk)
+            except sqlite3.OperationalError:
+                # The value is NULL
+                return io.BytesIO()
+        return io.BytesIO(self.data or b"")
 
     def __str__(self):
-        return f"Image(type={self.type}, size={len(self.data)})"
+        return f"Image(type={self.type}, size={self.size})"
+
+class VersionedModel(models.Model):
+    """
+    Model with a `version` that is incremented whenever its serialized representation
+    may have changed, used to build ETags without loading or serializing the object.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    # Only written with atomic updates, `save()` never overwrites them with possibly stale values
+    ATOMIC_FIELDS = ["version"]
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        if kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ATOMIC_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        self.bump_version()
+
+    def bump_version(self):
+        type(self).objects.filter(pk=self.pk).update(version=F("version") + 1)
+        self.refresh_from_db(fields=["version"])
 
-class Profile(models.Model):
+class Profile(VersionedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     biography = models.TextField(blank=True)
     profile_picture = models.ForeignKey(Image, null=True, blank=True, on_delete=models.SET_NULL)
@@ -30,12 +213,147 @@ def create_user_profile(instance: User, created: bool, **_):
 
 
 class Hashtag(models.Model):
+    # Stored normalized, so lookups can use the unique index instead of `iexact`
     value = models.TextField(unique=True)
 
+    @staticmethod
+    def normalize(value: str) -> str:
+        return value.lower()
+
+    def save(self, *args, **kwargs):
+        self.value = Hashtag.normalize(self.value)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"#{self.value}"
 
-class Post(models.Model):
+def _count_per_post(model: type[models.Model]):
+    counts = model.objects.filter(post=OuterRef("pk")).order_by().values("post").annotate(count=Count("pk"))
+    return Coalesce(Subquery(counts.values("count")), 0)
+
+# Per-viewer fields of `PostSerializer`
+VIEWER_FLAGS = ["is_liked", "is_bookmarked"]
+
+class PostQuerySet(models.QuerySet):
+    def for_serializer(self, user=None, fieldset: FieldSet | None = None, summary: bool = False):
+        """
+        Loads everything `PostSerializer` needs with a constant number of queries:
+        the viewer's like/bookmark flags are annotated, the author is joined
+        and tags and author post ids are prefetched.
+
+        With a `fieldset`, only what its selected fields need is loaded.
+        With `summary`, loads the excerpt for `PostSummarySerializer` instead of the content.
+        """
+        fieldset = fieldset or FieldSet()
+        queryset = self
+        if fieldset.includes("profile"):
+            queryset = queryset.select_related("profile__user" if fieldset.includes("profile.user") else "profile")
+            if fieldset.includes("profile.post_ids"):
+                queryset = queryset.prefetch_related(
+                    Prefetch("profile__post_set", queryset=Post.objects.only("id", "profile_id").order_by("id")),
+                )
+        if fieldset.includes("tags"):
+            queryset = queryset.prefetch_related("tags")
+        # Potentially long texts
+        texts = ["title", "excerpt"] if summary else ["title", "content"]
+        deferred = [name for name in ("title", "content", "excerpt") if name not in texts or not fieldset.includes(name)]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset.with_viewer_flags(user, [flag for flag in VIEWER_FLAGS if fieldset.includes(flag)])
+
+    def with_viewer_flags(self, user=None, flags=None):
+        """
+        Annotates whether `user` liked (`is_liked`) and bookmarked (`is_bookmarked`) each post,
+        or only the given `flags`. Nothing is annotated for anonymous users.
+        """
+        if user is None or not user.is_authenticated:
+            return self
+        annotations = {
+            "is_liked": Exists(Like.objects.filter(post=OuterRef("pk"), liker_profile__user=user)),
+            "is_bookmarked": Exists(Bookmark.objects.filter(post=OuterRef("pk"), creator_profile__user=user)),
+        }
+        return self.annotate(**{flag: annotations[flag] for flag in (VIEWER_FLAGS if flags is None else flags)})
+
+    def with_all_tags(self, tags: list[str]):
+        """
+        Posts tagged with every one of `tags` (case-insensitive), found with a single
+        grouped subquery over the tag table instead of one join per tag.
+        """
+        values = {Hashtag.normalize(tag) for tag in tags}
+        if not values:
+            return self
+        tagged = Post.tags.through.objects \
+            .filter(hashtag_id__in=Hashtag.objects.filter(value__in=values).values("id")) \
+            .order_by().values("post_id") \
+            .annotate(tag_count=Count("hashtag_id")) \
+            .filter(tag_count=len(values)) \
+            .values("post_id")
+        return self.filter(id__in=tagged)
+
+    def search(self, keywords: list[str]):
+        """
+        Posts containing every keyword in their title or content (case-insensitive).
+
+        On SQLite, keywords of at least 3 characters are matched with the `PostSearchIndex`
+        full-text index and the posts are annotated with their BM25 `search_rank` (lower is better).
+        Shorter keywords, and all keywords on other databases, fall back to a substring scan.
+        """
+        queryset = self
+        indexed = []
+        if connections[self.db].vendor == "sqlite":
+            indexed = [keyword for keyword in keywords if len(keyword) >= PostSearchIndex.MIN_KEYWORD_LENGTH]
+
+        if indexed:
+            query = " AND ".join('"' + keyword.replace('"', '""') + '"' for keyword in indexed)
+            queryset = queryset.filter(search_index__document__match=query) \
+                .annotate(search_rank=F("search_index__rank"))
+
+        for keyword in keywords:
+            if keyword not in indexed:
+                queryset = queryset.filter(Q(title__icontains=keyword) | Q(content__icontains=keyword))
+        return queryset
+
+    def with_counter_drift(self):
+        """Posts whose stored engagement counters differ from the actual counts"""
+        return self.annotate(
+            actual_like_count=_count_per_post(Like),
+            actual_comment_count=_count_per_post(Comment),
+            actual_bookmark_count=_count_per_post(Bookmark),
+        ).filter(
+            ~Q(like_count=F("actual_like_count"))
+            | ~Q(comment_count=F("actual_comment_count"))
+            | ~Q(bookmark_count=F("actual_bookmark_count"))
+        )
+
+    def recount_engagement(self) -> int:
+        """
+        Sets the engagement counters to the actual counts, counted in the UPDATE itself so that
+        concurrent `adjust_counter` calls are not overwritten. Returns the number of updated posts.
+        """
+        return self.update(
+            like_count=_count_per_post(Like),
+            comment_count=_count_per_post(Comment),
+            bookmark_count=_count_per_post(Bookmark),
+            # The counters are part of the serialized posts, invalidate their ETags
+            version=F("version") + 1,
+        )
+
+# Stored summary of the post content, shown in lists instead of the full content
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+def summarize_content(content: str) -> tuple[str, int, int]:
+    """Plain text excerpt, word count and reading time in minutes of the HTML `content`"""
+    text = " ".join(html.unescape(strip_tags(content)).split())
+    word_count = len(text.split())
+    reading_time = math.ceil(word_count / WORDS_PER_MINUTE)
+    return Truncator(text).chars(EXCERPT_LENGTH), word_count, reading_time
+
+# "Hot" ranking: weighted engagement decaying with the age of the post
+HOT_SCORE_WEIGHTS = {"like_count": 1, "comment_count": 2, "bookmark_count": 3}
+HOT_SCORE_GRAVITY = 1.8
+
+class Post(VersionedModel):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     title = models.TextField(blank=False)
     content = models.TextField(blank=True)
@@ -43,15 +361,184 @@ class Post(models.Model):
     tags = models.ManyToManyField(Hashtag, blank=True)
     draft = models.BooleanField(default=False)
 
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    # Derived from the content on save, see `summarize_content`
+    excerpt = models.TextField(blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveIntegerField(default=0)
+
+    # Denormalized engagement counters, kept up to date with `adjust_counter`
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+    # Refreshed on engagement and periodically by the `refresh_hot_scores` command
+    hot_score = models.FloatField(default=0)
+
+    ATOMIC_FIELDS = ["version", "like_count", "comment_count", "bookmark_count", "hot_score"]
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        # Partial indexes over published posts: `filter(draft=False)` compiles to `NOT draft` on SQLite,
+        # which matches the index condition but could not seek a leading `draft` column
+        indexes = [
+            models.Index(fields=["-like_count", "-id"], condition=Q(draft=False), name="blog_api_post_likes_idx"),
+            models.Index(fields=["-published_at", "-id"], condition=Q(draft=False), name="blog_api_post_published_idx"),
+            models.Index(fields=["-hot_score", "-id"], condition=Q(draft=False), name="blog_api_post_hot_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Posts created without going through the draft stage are published immediately
+        if not self.draft and self.published_at is None:
+            self.published_at = timezone.now()
+        self.excerpt, self.word_count, self.reading_time = summarize_content(self.content)
+
+        adding = self._state.adding
+        if adding:
+            self.hot_score = self.compute_hot_score()
+        super().save(*args, **kwargs)
+        if adding:
+            # The author's profile lists the ids of their posts
+            Profile.objects.filter(pk=self.profile_id).update(version=F("version") + 1)
+
+    def publish(self):
+        """Publishes a draft, already published posts keep their publication date"""
+        if self.draft:
+            self.draft = False
+            self.published_at = timezone.now()
+            self.save()
+            self.refresh_hot_score()
+
+    def adjust_counter(self, counter: str, delta: int):
+        """Atomically adds `delta` to one of the engagement counters, reloads the counters and refreshes the hot score"""
+        Post.objects.filter(pk=self.pk).update(
+            **{counter: Greatest(F(counter) + delta, 0)},
+            version=F("version") + 1,
+        )
+        self.refresh_from_db(fields=[*HOT_SCORE_WEIGHTS, "version"])
+        self.refresh_hot_score()
+
+    def compute_hot_score(self, now=None) -> float:
+        if self.draft or self.published_at is None:
+            return 0.0
+        age_hours = max((now or timezone.now()) - self.published_at, timedelta()).total_seconds() / 3600
+        engagement = 1 + sum(weight * getattr(self, counter) for counter, weight in HOT_SCORE_WEIGHTS.items())
+        return engagement / (age_hours + 2) ** HOT_SCORE_GRAVITY
+
+    def refresh_hot_score(self, now=None):
+        self.hot_score = self.compute_hot_score(now)
+        Post.objects.filter(pk=self.pk).update(hot_score=self.hot_score)
+
     def __str__(self):
         name = "Draft" if self.draft else "Post"
         return f"{name}(id={self.id}, profile={self.profile}, title={self.title})"
 
-class Comment(models.Model):
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table, which is matched against full-text queries"""
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+class PostSearchIndex(models.Model):
+    """
+    SQLite FTS5 trigram index over post titles and contents, created by migration
+    and kept in sync with `blog_api_post` by `SEARCH_INDEX_TRIGGERS`. Read-only for Django.
+    """
+    # The trigram tokenizer cannot match shorter strings
+    MIN_KEYWORD_LENGTH = 3
+
+    post = models.OneToOneField(Post, primary_key=True, db_column="rowid", db_constraint=False,
+                                on_delete=models.DO_NOTHING, related_name="search_index")
+    title = models.TextField()
+    content = models.TextField()
+    document = SearchDocumentField(db_column="blog_api_post_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "blog_api_post_fts"
+
+# Same triggers as created by migration 0007. SQLite drops triggers when a migration
+# rebuilds `blog_api_post` (e.g. to add a column), so they are restored after every migrate.
+SEARCH_INDEX_TRIGGERS = {
+    "blog_api_post_fts_insert": """
+        CREATE TRIGGER blog_api_post_fts_insert AFTER INSERT ON blog_api_post BEGIN
+            INSERT INTO blog_api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """,
+    "blog_api_post_fts_delete": """
+        CREATE TRIGGER blog_api_post_fts_delete AFTER DELETE ON blog_api_post BEGIN
+            INSERT INTO blog_api_post_fts(blog_api_post_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    """,
+    "blog_api_post_fts_update": """
+        CREATE TRIGGER blog_api_post_fts_update AFTER UPDATE OF title, content ON blog_api_post BEGIN
+            INSERT INTO blog_api_post_fts(blog_api_post_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO blog_api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """,
+}
+
+@receiver(post_migrate)
+def restore_search_index_triggers(sender, using: str, **_):
+    connection = connections[using]
+    if sender.name != "blog_api" or connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if PostSearchIndex._meta.db_table not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'blog_api_post'")
+        existing = {name for (name,) in cursor.fetchall()}
+        missing = [sql for name, sql in SEARCH_INDEX_TRIGGERS.items() if name not in existing]
+        if not missing:
+            return
+        for sql in missing:
+            cursor.execute(sql)
+        # Posts may have changed while the triggers were missing
+        cursor.execute("INSERT INTO blog_api_post_fts(blog_api_post_fts) VALUES ('rebuild')")
+
+@receiver(post_delete, sender=Post)
+def bump_author_profile_version(instance: Post, **_):
+    Profile.objects.filter(pk=instance.profile_id).update(version=F("version") + 1)
+
+def tagged_post_ids(instance, action: str, reverse: bool, pk_set) -> list[int]:
+    """Ids of the posts whose tags are changed by an `m2m_changed` signal of `Post.tags`"""
+    if not reverse:
+        return [instance.pk] if action in ("post_add", "post_remove", "post_clear") else []
+    if action in ("post_add", "post_remove"):
+        return list(pk_set)
+    if action == "pre_clear":
+        # Clearing the posts of a hashtag does not report which posts they were
+        return list(instance.post_set.values_list("id", flat=True))
+    return []
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_tagged_post_versions(instance, action: str, reverse: bool, pk_set, **_):
+    post_ids = tagged_post_ids(instance, action, reverse, pk_set)
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(version=F("version") + 1)
+
+class Comment(VersionedModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     author_profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "id"], name="blog_api_comment_post_idx"),
+        ]
+
 class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     liker_profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
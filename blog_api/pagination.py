@@ -0,0 +1,96 @@
+import base64
+import binascii
+import datetime
+import functools
+import json
+import math
+import operator
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _json_default(value):
+    # Unlike DjangoJSONEncoder, keep microseconds: cursor values must match rows exactly
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _encode_cursor(ordering: list[str], values: list) -> str:
+    payload = json.dumps({"o": ordering, "v": values}, default=_json_default)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _output_field(queryset: QuerySet, name: str):
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+def _checked(value):
+    """Rejects values which cannot be compared with the rows of a page, e.g. `null` or integers SQLite cannot bind"""
+    if value is None:
+        raise InvalidCursor()
+    if isinstance(value, float) and not math.isfinite(value):
+        raise InvalidCursor()
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+        raise InvalidCursor()
+    return value
+
+
+def _decode_cursor(queryset: QuerySet, ordering: list[str], cursor: str) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload["o"] != ordering or len(payload["v"]) != len(ordering):
+            raise InvalidCursor()
+        return [
+            _checked(_output_field(queryset, name.lstrip("-")).to_python(_checked(value)))
+            for name, value in zip(ordering, payload["v"])
+        ]
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError, ValidationError) as e:
+        raise InvalidCursor() from e
+
+
+def _after(ordering: list[str], values: list) -> Q:
+    """Rows sorted after the row with the given values of the ordering fields"""
+    conditions = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {other.lstrip("-"): value for other, value in zip(ordering[:index], values)}
+        conditions.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+    # The redundant bound on the first field, outside of the OR, lets the database seek an index on the ordering
+    first = ordering[0]
+    bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+    return bound & functools.reduce(operator.or_, conditions)
+
+
+def paginate(queryset: QuerySet, ordering: list[str], limit: int, cursor: str | None = None) -> tuple[list, str | None]:
+    """
+    Returns one page of `queryset` sorted by `ordering` and the cursor of the next page,
+    or `None` if this is the last page.
+
+    Uses keyset pagination: the cursor stores the ordering values of the last row of the page,
+    so every page is a range scan on an index over `ordering` instead of an OFFSET.
+    Ordering fields may be model fields or annotations, the last one must be unique, e.g. `-id`.
+
+    Raises `InvalidCursor` if the cursor is malformed or belongs to another ordering.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, _decode_cursor(queryset, ordering, cursor)))
+
+    page = list(queryset[:limit + 1])
+    if len(page) <= limit:
+        return page, None
+
+    page = page[:limit]
+    last = page[-1]
+    return page, _encode_cursor(ordering, [getattr(last, field.lstrip("-")) for field in ordering])
@@ -0,0 +1,69 @@
+"""
+Cache of serialized posts for `PostView.get`.
+
+Entries hold the viewer-independent representation of a post, i.e. with `is_liked` and
+`is_bookmarked` unset, together with the post and author profile versions it was serialized at.
+An entry is only used while both versions are current, and the receivers below evict entries
+as soon as anything they contain changes, so stale entries do not linger in the cache.
+"""
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from blog_api import models
+
+
+def _key(post_id: int) -> str:
+    return f"blog_api:post:{post_id}"
+
+
+def lookup(post_id: int, version: int, profile_version: int) -> dict | None:
+    """The cached representation of the post at the given versions, or `None`"""
+    entry = cache.get(_key(post_id))
+    if entry is None or entry["versions"] != (version, profile_version):
+        return None
+    return entry["data"]
+
+
+def store(post: models.Post, data: dict):
+    """Stores `data` serialized from `post`, which must have been loaded with its profile"""
+    cache.set(_key(post.id), {"versions": (post.version, post.profile.version), "data": data})
+
+
+def invalidate(post_ids):
+    cache.delete_many([_key(post_id) for post_id in post_ids])
+
+
+def invalidate_profile(profile_id: int):
+    """Evicts all posts of a profile, which embed the author's profile"""
+    invalidate(models.Post.objects.filter(profile_id=profile_id).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=models.Post)
+@receiver(post_delete, sender=models.Post)
+def invalidate_post(instance: models.Post, created: bool = True, **_):
+    invalidate([instance.id])
+    # Creating or deleting (which sends no `created`) a post changes the post ids of the author's profile
+    if created:
+        invalidate_profile(instance.profile_id)
+
+
+@receiver(post_save, sender=models.Like)
+@receiver(post_delete, sender=models.Like)
+@receiver(post_save, sender=models.Comment)
+@receiver(post_delete, sender=models.Comment)
+@receiver(post_save, sender=models.Bookmark)
+@receiver(post_delete, sender=models.Bookmark)
+def invalidate_engaged_post(instance, **_):
+    invalidate([instance.post_id])
+
+
+@receiver(post_save, sender=models.Profile)
+def invalidate_author_posts(instance: models.Profile, created: bool, **_):
+    if not created:
+        invalidate_profile(instance.id)
+
+
+@receiver(m2m_changed, sender=models.Post.tags.through)
+def invalidate_tagged_posts(instance, action: str, reverse: bool, pk_set, **_):
+    invalidate(models.tagged_post_ids(instance, action, reverse, pk_set))
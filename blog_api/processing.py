@@ -0,0 +1,67 @@
+"""
+Processing of uploaded images in the background, after the upload request has returned.
+
+Images are verified to decode as their declared type, their dimensions are recorded and their bytes are
+replaced with optimized ones, see `imaging.optimize`. PNGs are only replaced when that makes them smaller,
+JPEGs whenever they have metadata, which is all that is removed from them. Images which were not
+processed, e.g. because the server stopped, are processed by the `process_images` command.
+"""
+import logging
+
+from django.db import IntegrityError, connections, transaction
+
+from blog_api import blobstore, imaging, models
+
+logger = logging.getLogger(__name__)
+
+
+def schedule(image_id: int):
+    """Processes the image in the worker pool once the current transaction is committed"""
+    transaction.on_commit(lambda: imaging.executor().submit(_run, image_id))
+
+
+def _run(image_id: int):
+    try:
+        process_image(image_id)
+    except Exception:
+        logger.exception("Processing image %s failed", image_id)
+    finally:
+        # Worker threads have their own database connections
+        connections.close_all()
+
+
+def process_image(image_id: int):
+    """Verifies and optimizes the image, unless it was already processed or is still stored in the database"""
+    image = models.Image.objects.filter(pk=image_id, processed=False).exclude(sha256="").first()
+    if image is None:
+        return
+
+    width = height = optimized = None
+    valid = True
+    if image.type in imaging.PIL_FORMATS:
+        try:
+            with image.open() as file:
+                width, height, optimized = imaging.optimize(file, image.type)
+        except imaging.DECODE_ERRORS:
+            # Kept and served as uploaded, but never resized or converted
+            logger.warning("Image %s does not decode as %s", image_id, image.type)
+            valid = False
+
+    fields = {"processed": True, "valid": valid, "width": width, "height": height}
+    images = models.Image.objects.filter(pk=image.pk, sha256=image.sha256)
+    # Only the metadata of JPEGs is removed, it may include private data such as the location of the photo
+    if optimized is not None and (image.type == "JPEG" or len(optimized) < image.size):
+        sha256, size = blobstore.write_blob([optimized])
+        replaced = 0
+        if sha256 != image.sha256:
+            try:
+                with transaction.atomic():
+                    replaced = images.update(sha256=sha256, size=size, original_sha256=image.sha256, **fields)
+            except IntegrityError:
+                # Another image of the same type already has the optimized content, both are kept
+                logger.warning("Optimized image %s is identical to another image", image_id)
+        if replaced:
+            if not models.Image.objects.filter(sha256=image.sha256).exists():
+                blobstore.delete_blob(image.sha256)
+            return
+    images.update(**fields)
@@ -0,0 +1,140 @@
+"""
+HTTP range requests (RFC 9110, section 14) for files served from seekable file objects.
+
+Files are read in chunks of `READ_CHUNK_SIZE` bytes, and only the requested ranges are read, after
+seeking to them, so resuming a download or fetching the header of a large image does not read the whole file.
+"""
+import os
+import secrets
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+
+# Bytes read from the file at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+# Requests for more ranges are answered with the whole file, a long list of tiny ranges costs more than it saves
+MAX_RANGES = 16
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    The satisfiable byte ranges of a `Range` header as sorted and merged `(first, last)` offsets,
+    an empty list if none is satisfiable, or `None` if the header is invalid and must be ignored
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    specs = specs.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+        if not dash or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+            return None
+        if not first:
+            # The last N bytes
+            if int(last) > 0 and size > 0:
+                ranges.append((max(0, size - int(last)), size - 1))
+            continue
+        if last and int(last) < int(first):
+            return None
+        if int(first) < size:
+            ranges.append((int(first), min(int(last), size - 1) if last else size - 1))
+
+    merged: list[tuple[int, int]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _read(file: BinaryIO, first: int, last: int) -> Iterator[bytes]:
+    file.seek(first)
+    remaining = last - first + 1
+    while remaining > 0:
+        chunk = file.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _multiple_ranges(file: BinaryIO, parts: list[tuple[bytes, int, int]], closing: bytes) -> Iterator[bytes]:
+    for headers, first, last in parts:
+        yield headers
+        yield from _read(file, first, last)
+    yield closing
+
+
+class _FileContent:
+    """Content read from `file`, which is closed with the response even if the content is never read"""
+
+    def __init__(self, file: BinaryIO, chunks: Iterator[bytes]):
+        self.file = file
+        self.chunks = chunks
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.file.close()
+
+
+def file_response(request, file: BinaryIO, content_type: str, etag: str) -> HttpResponseBase:
+    """
+    Responds with `file`, or with `206 Partial Content` for the ranges requested with the `Range` header.
+    A `Range` is only honored if `If-Range` is absent or matches `etag`, since the ranges may refer to
+    another version of the file otherwise.
+    """
+    size = file.seek(0, os.SEEK_END)
+    file.seek(0)
+
+    byte_ranges = None
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and (if_range is None or if_range == etag):
+        byte_ranges = parse_range(request.headers["Range"], size)
+
+    if byte_ranges is None:
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = READ_CHUNK_SIZE
+    elif not byte_ranges:
+        file.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif len(byte_ranges) == 1:
+        first, last = byte_ranges[0]
+        response = StreamingHttpResponse(
+            _FileContent(file, _read(file, first, last)), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = str(last - first + 1)
+    else:
+        boundary = secrets.token_hex(16)
+        parts = [
+            (
+                (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Range: bytes {first}-{last}/{size}\r\n\r\n").encode(),
+                first,
+                last,
+            )
+            for first, last in byte_ranges
+        ]
+        closing = f"\r\n--{boundary}--\r\n".encode()
+        response = StreamingHttpResponse(
+            _FileContent(file, _multiple_ranges(file, parts, closing)),
+            status=206,
+            content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response["Content-Length"] = str(
+            sum(len(headers) + last - first + 1 for headers, first, last in parts) + len(closing)
+        )
+
+    response["Accept-Ranges"] = "bytes"
+    return response
@@ -2,8 +2,24 @@ import enum
 from django.contrib.auth.models import User
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from blog_api import models
+from blog_api.pagination import MAX_PAGE_SIZE
+
+
+class PaginationSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_PAGE_SIZE,
+        default=api_settings.PAGE_SIZE,
+        help_text=f"Maximum number of results per page, at most {MAX_PAGE_SIZE}. Example: 20"
+    )
+    cursor = serializers.CharField(
+        required=False,
+        allow_null=True,
+        help_text="Cursor of the page to return, taken from `next` of the previous page. Omit for the first page."
+    )
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -56,6 +72,8 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.ListField(child=serializers.IntegerField()))
     def get_post_ids(self, obj: models.Profile) -> list[int]:
+        if "post_set" in getattr(obj, "_prefetched_objects_cache", {}):
+            return [post.id for post in obj.post_set.all()]  # type: ignore
         return list(obj.post_set.values_list('id', flat=True))  # type: ignore
 
 
@@ -68,14 +86,42 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         fields = ["biography", "profile_picture"]
 
 
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    """Compact representation of the author of a comment, read from the profile and its user only"""
+    id = serializers.IntegerField(source="user_id", read_only=True, help_text="User ID of the author")
+    username = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = models.Profile
+        fields = ["id", "username", "profile_picture"]
+
+
 class CommentSerializer(serializers.ModelSerializer):
-    author_profile = ProfileSerializer(read_only=True)
+    author_profile = AuthorSummarySerializer(read_only=True)
 
     class Meta:
         model = models.Comment
         fields = ["id", "post", "author_profile", "content"]
 
 
+class CommentOrder(enum.Enum):
+    OLDEST = "OLDEST"
+    NEWEST = "NEWEST"
+
+
+class CommentPaginationSerializer(PaginationSerializer):
+    order = serializers.ChoiceField(
+        choices=[entry.value for entry in CommentOrder],
+        default=CommentOrder.OLDEST.value,
+        help_text="Return the oldest or the newest comments first. Example: 'OLDEST'"
+    )
+
+
+class CommentPageSerializer(serializers.Serializer):
+    results = CommentSerializer(many=True)
+    next = serializers.CharField(allow_null=True, help_text="Cursor of the next page, null on the last page")
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Comment
@@ -85,38 +131,67 @@ class CommentCreateSerializer(serializers.ModelSerializer):
 class PostSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer()
     tags = serializers.SlugRelatedField(slug_field="value", read_only=True, many=True)
-    like_count = serializers.SerializerMethodField()
-    comment_count = serializers.SerializerMethodField()
-    bookmark_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     is_bookmarked = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Post
-        fields = ["id", "profile", "title", "content", "image", "tags", "like_count", "comment_count", "bookmark_count", "is_liked", "is_bookmarked", "draft"]
-
-    def get_like_count(self, obj):
-        return obj.like_set.count()
+        fields = ["id", "profile", "title", "content", "word_count", "reading_time", "image", "tags", "like_count", "comment_count", "bookmark_count", "is_liked", "is_bookmarked", "draft", "created_at", "updated_at", "published_at"]
+        read_only_fields = ["word_count", "reading_time", "like_count", "comment_count", "bookmark_count", "published_at"]
 
-    def get_comment_count(self, obj):
-        return obj.comment_set.count()
+    # The flags below are read from annotations when the post was loaded with
+    # `Post.objects.for_serializer()`, otherwise they are queried per post
 
-    def get_bookmark_count(self, obj):
-        return obj.bookmark_set.count()
-
-    def get_is_liked(self, obj):
+    def get_is_liked(self, obj) -> bool:
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, "is_liked"):
+                return obj.is_liked
             return obj.like_set.filter(liker_profile=request.user.profile).exists()
         return False
 
-    def get_is_bookmarked(self, obj):
+    def get_is_bookmarked(self, obj) -> bool:
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, "is_bookmarked"):
+                return obj.is_bookmarked
             return obj.bookmark_set.filter(creator_profile=request.user.profile).exists()
         return False
 
 
+class PostSummarySerializer(PostSerializer):
+    """Compact representation for lists, with a plain text excerpt instead of the full content"""
+
+    class Meta(PostSerializer.Meta):
+        fields = [("excerpt" if field == "content" else field) for field in PostSerializer.Meta.fields]
+        read_only_fields = ["excerpt", *PostSerializer.Meta.read_only_fields]
+
+
+class PostPageSerializer(serializers.Serializer):
+    results = PostSummarySerializer(many=True)
+    next = serializers.CharField(allow_null=True, help_text="Cursor of the next page, null on the last page")
+
+
+class PostBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        # Bounded by the range of SQLite integers, larger IDs cannot be queried
+        child=serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1),
+        min_length=1,
+        max_length=100,
+        help_text="IDs of the posts to retrieve, at most 100. Example: [3, 1, 2]"
+    )
+
+
+class PostBatchItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(help_text="Requested post ID")
+    post = PostSummarySerializer(required=False, help_text="The post, if it could be retrieved")
+    error = serializers.CharField(required=False, help_text="Reason why the post could not be retrieved")
+
+
+class PostBatchResponseSerializer(serializers.Serializer):
+    posts = PostBatchItemSerializer(many=True, help_text="One entry per requested ID, in request order")
+
+
 class PostUpdateSerializer(serializers.ModelSerializer):
     tags = serializers.ListField(
         child=serializers.CharField(),
@@ -146,7 +221,7 @@ class PostUpdateSerializer(serializers.ModelSerializer):
 
 
 class BookmarkSerializer(serializers.ModelSerializer):
-    post = PostSerializer(read_only=True)
+    post = PostSummarySerializer(read_only=True)
     creator_profile = ProfileSerializer(read_only=True)
 
     class Meta:
@@ -196,8 +271,10 @@ class ProfileDraftsSerializer(serializers.ModelSerializer):
 class PostSortingMethod(enum.Enum):
     DATE = "DATE"
     LIKES = "LIKES"
+    RELEVANCE = "RELEVANCE"
+    HOT = "HOT"
 
-class PostFilterSerializer(serializers.Serializer):
+class PostFilterSerializer(PaginationSerializer):
     author_id = serializers.IntegerField(
         required=False, 
         allow_null=True,
@@ -208,6 +285,16 @@ class PostFilterSerializer(serializers.Serializer):
         allow_null=True,
         help_text="Filter posts by author's username (case-insensitive). Example: 'john_doe'"
     )
+    published_after = serializers.DateTimeField(
+        required=False,
+        allow_null=True,
+        help_text="Only include posts published at or after this time. Example: '2025-01-01T00:00:00Z'"
+    )
+    published_before = serializers.DateTimeField(
+        required=False,
+        allow_null=True,
+        help_text="Only include posts published before this time. Example: '2025-02-01T00:00:00Z'"
+    )
     keywords = serializers.ListField(
         child=serializers.CharField(), 
         default=[],
@@ -221,7 +308,7 @@ class PostFilterSerializer(serializers.Serializer):
     sort_by = serializers.ChoiceField(
         choices=[entry.value for entry in PostSortingMethod], 
         default=PostSortingMethod.DATE.value,
-        help_text="Sort results by date (newest first) or likes (most popular first). Example: 'DATE'"
+        help_text="Sort results by publication date (newest first), likes (most popular first), recent engagement (hottest first) or relevance to the keywords (best match first, newest first without keywords). Example: 'DATE'"
     )
 
 class PostListSerializer(serializers.Serializer):
@@ -229,3 +316,4 @@ class PostListSerializer(serializers.Serializer):
         child=serializers.IntegerField(),
         help_text="List of post IDs. Example: [1, 2, 3]"
     )
+    next = serializers.CharField(allow_null=True, help_text="Cursor of the next page, null on the last page")
@@ -0,0 +1,43 @@
+import json
+from collections.abc import Callable, Iterable, Iterator
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from blog_api.pagination import paginate
+
+# Rows loaded, prefetched and serialized at a time
+STREAM_CHUNK_SIZE = 100
+
+
+def _encode(item) -> str:
+    # Same output as the JSONRenderer with the default settings
+    return json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def stream_json_array(
+    queryset: QuerySet, serialize: Callable[[list], Iterable], chunk_size: int = STREAM_CHUNK_SIZE
+) -> StreamingHttpResponse:
+    """
+    Responds with the JSON array of `serialize(chunk)` over the rows of `queryset` in `id` order, emitted
+    while the rows are read. Only one chunk of rows is held in memory at a time, and prefetches of
+    `queryset` are done per chunk.
+
+    Each chunk is a keyset page read with its own query, so no database cursor is left open while
+    the client receives the response: on SQLite an open cursor would block writers until then.
+    """
+    def content() -> Iterator[str]:
+        yield "["
+        separator = ""
+        cursor = None
+        while True:
+            chunk, cursor = paginate(queryset, ["id"], chunk_size, cursor)
+            if chunk:
+                yield separator + ",".join(_encode(item) for item in serialize(chunk))
+                separator = ","
+            if cursor is None:
+                break
+        yield "]"
+
+    return StreamingHttpResponse(content(), content_type="application/json")
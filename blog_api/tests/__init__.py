@@ -1,17 +1,19 @@
 from .auth_test import AuthenticationTests
 from .bookmark_test import BookmarkPostViewTests, BookmarkListViewTests, BookmarkInstanceViewTests
 from .comment_test import CommentViewTests
-from .image_test import ImageViewTests
+from .image_test import ImageViewTests, ImageCachingTests, ImageBlobStoreTests, ImageUploadTests, ImageDeduplicationTests, ImageVariantTests, ImageRangeTests, ImageDatabaseBlobTests, ImageProcessingTests, ImageFormatNegotiationTests, ImageMetadataTests, OrphanCollectionTests
 from .like_test import LikeViewTests
-from .post_test import PostViewTests
+from .post_filter_test import PostFilterViewTests
+from .post_test import PostViewTests, PostViewCacheTests, PostBatchViewTests, PostListViewTests
 from .profile_test import ProfileViewTests, MeProfileViewTests, UsernameProfileViewTests
 
 __all__ = [
     "AuthenticationTests",
     "BookmarkPostViewTests", "BookmarkListViewTests", "BookmarkInstanceViewTests",
     "CommentViewTests",
-    "ImageViewTests",
+    "ImageViewTests", "ImageCachingTests", "ImageBlobStoreTests", "ImageUploadTests", "ImageDeduplicationTests", "ImageVariantTests", "ImageRangeTests", "ImageDatabaseBlobTests", "ImageProcessingTests", "ImageFormatNegotiationTests", "ImageMetadataTests", "OrphanCollectionTests",
     "LikeViewTests",
-    "PostViewTests",
+    "PostFilterViewTests",
+    "PostViewTests", "PostViewCacheTests", "PostBatchViewTests", "PostListViewTests",
     "ProfileViewTests", "MeProfileViewTests", "UsernameProfileViewTests"
 ]
\ No newline at end of file
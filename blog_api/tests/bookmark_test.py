@@ -1,7 +1,10 @@
+import json
+
 from django.contrib.auth.models import User
 from django.test import TestCase
 from rest_framework import status
-from blog_api import models
+from blog_api import models, serializers
+from blog_api.streaming import STREAM_CHUNK_SIZE, stream_json_array
 
 
 class BookmarkPostViewTests(TestCase):
@@ -31,6 +34,7 @@ class BookmarkPostViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data["title"], "My Bookmark")
         self.assertEqual(response.data["post"]["id"], self.post.id)
+        self.assertEqual(response.data["post"]["bookmark_count"], 1)
         
         # Verify bookmark was created in database
         self.assertTrue(models.Bookmark.objects.filter(
@@ -113,6 +117,10 @@ class BookmarkListViewTests(TestCase):
         )
         
         self.bookmarks_url = "/api/bookmarks/"
+
+    def _read(self, response):
+        """Parses the streamed JSON list"""
+        return json.loads(b"".join(response.streaming_content))
     
     def test_list_retrieval(self):
         """Test all user bookmarks are returned"""
@@ -133,13 +141,40 @@ class BookmarkListViewTests(TestCase):
         response = self.client.get(self.bookmarks_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        data = self._read(response)
+        self.assertEqual(len(data), 2)
         
         # Check that correct bookmarks are returned
-        bookmark_titles = [b["title"] for b in response.data]
+        bookmark_titles = [b["title"] for b in data]
         self.assertIn("Bookmark 1", bookmark_titles)
         self.assertIn("Bookmark 2", bookmark_titles)
     
+    def test_list_not_modified(self):
+        """Test the list is answered with 304 until a bookmark, one of its posts or their authors change"""
+        bookmark = models.Bookmark.objects.create(post=self.post1, creator_profile=self.user.profile, title="Bookmark")
+        self.client.login(username="testuser", password="testpass123")
+        etag = self.client.get(self.bookmarks_url)["ETag"]
+
+        response = self.client.get(self.bookmarks_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        changes = [
+            lambda: models.Bookmark.objects.filter(pk=bookmark.pk).update(title="Renamed"),
+            lambda: self.post1.adjust_counter("like_count", 1),
+            lambda: models.Post.objects.create(profile=self.user.profile, title="New post"),
+            lambda: models.Bookmark.objects.create(post=self.post2, creator_profile=self.user.profile),
+        ]
+        for change in changes:
+            change()
+            response = self.client.get(self.bookmarks_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self._read(response)
+            etag = response["ETag"]
+
+        other_client = self.client_class()
+        other_client.login(username="otheruser", password="testpass123")
+        self.assertNotEqual(other_client.get(self.bookmarks_url)["ETag"], etag)
+
     def test_empty_list(self):
         """Test behavior when user has no bookmarks"""
         self.client.login(username="testuser", password="testpass123")
@@ -147,7 +182,7 @@ class BookmarkListViewTests(TestCase):
         response = self.client.get(self.bookmarks_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(self._read(response), [])
     
     def test_authentication_required(self):
         """Test unauthenticated requests are rejected"""
@@ -175,8 +210,53 @@ class BookmarkListViewTests(TestCase):
         response = self.client.get(self.bookmarks_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "User bookmark")
+        data = self._read(response)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["title"], "User bookmark")
+
+    def test_list_sparse_fields(self):
+        """Test `fields` selects fields of the bookmarks and of their posts"""
+        models.Bookmark.objects.create(post=self.post1, creator_profile=self.user.profile, title="Bookmark 1")
+        self.client.login(username="testuser", password="testpass123")
+
+        response = self.client.get(self.bookmarks_url, {"fields": "title,post.id,post.title"})
+        self.assertEqual(self._read(response), [{"title": "Bookmark 1", "post": {"id": self.post1.id, "title": "Test Post 1"}}])
+
+    def test_list_is_streamed_in_chunks(self):
+        """Test long lists are streamed chunk by chunk with the same content as the serializer"""
+        posts = [
+            models.Post.objects.create(profile=self.other_user.profile, title=f"Post {i}")
+            for i in range(STREAM_CHUNK_SIZE + 1)
+        ]
+        for post in posts:
+            models.Bookmark.objects.create(post=post, creator_profile=self.user.profile, title=post.title)
+
+        self.client.login(username="testuser", password="testpass123")
+        response = self.client.get(self.bookmarks_url)
+
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 4)  # Brackets and two chunks of bookmarks
+
+        bookmarks = models.Bookmark.objects.filter(creator_profile=self.user.profile).order_by("id")
+        expected = json.loads(json.dumps(serializers.BookmarkSerializer(bookmarks, many=True).data))
+        self.assertEqual(json.loads(b"".join(chunks)), expected)
+
+    def test_stream_reads_one_page_per_chunk(self):
+        """Test each chunk is read with its own query, no query is still being read when a chunk is sent"""
+        for i, post in enumerate([self.post1, self.post2, self.post1]):
+            profile = self.other_user.profile if i == 2 else self.user.profile
+            models.Bookmark.objects.create(post=post, creator_profile=profile, title=f"Bookmark {i}")
+        bookmarks = models.Bookmark.objects.all()
+
+        response = stream_json_array(bookmarks, lambda chunk: [bookmark.title for bookmark in chunk], chunk_size=2)
+        content = iter(response.streaming_content)
+        with self.assertNumQueries(1):
+            self.assertEqual(next(content), b"[")
+            self.assertEqual(json.loads(next(content).decode().join("[]")), ["Bookmark 0", "Bookmark 1"])
+        with self.assertNumQueries(1):
+            rest = b"".join(content)
+        self.assertEqual(rest, b',"Bookmark 2"]')
 
 
 class BookmarkInstanceViewTests(TestCase):
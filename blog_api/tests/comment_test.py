@@ -2,6 +2,7 @@ from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from blog_api import models
+from blog_api.tests.helpers import crafted_cursor
 
 
 class CommentViewTests(TestCase):
@@ -22,6 +23,8 @@ class CommentViewTests(TestCase):
         response = self.client.post(self.comment_url, {"content": "Test comment"})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(models.Comment.objects.filter(post=self.post, content="Test comment").exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
 
     def test_create_comment_invalid_data(self):
         """Test creating a comment with invalid data"""
@@ -38,7 +41,105 @@ class CommentViewTests(TestCase):
 
         response = self.client.get(self.comment_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["author_profile"], {
+            "id": self.user.id, "username": "testuser", "profile_picture": None
+        })
+        self.assertIsNone(response.data["next"])
+
+    def test_list_comments_paginated(self):
+        """Test comments are listed in pages, oldest or newest first"""
+        comments = [
+            models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content=f"Comment {i}")
+            for i in range(5)
+        ]
+
+        for order, expected in [("OLDEST", comments), ("NEWEST", comments[::-1])]:
+            ids = []
+            cursor = None
+            while True:
+                params = {"limit": 2, "order": order, **({"cursor": cursor} if cursor else {})}
+                response = self.client.get(self.comment_url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                ids += [comment["id"] for comment in response.data["results"]]
+                cursor = response.data["next"]
+                if cursor is None:
+                    break
+            self.assertEqual(ids, [comment.id for comment in expected])
+
+    def test_list_comments_invalid_cursor(self):
+        """Test a malformed cursor, or a cursor of the other order, is rejected"""
+        for i in range(3):
+            models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content=f"Comment {i}")
+        cursor = self.client.get(self.comment_url, {"limit": 1}).data["next"]
+
+        response = self.client.get(self.comment_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.comment_url, {"cursor": cursor, "order": "NEWEST"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.comment_url, {"cursor": crafted_cursor(["id"], [None])})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_comments_constant_queries(self):
+        """Test a page with many different authors is loaded in two queries"""
+        for i in range(30):
+            author = models.User.objects.create_user(username=f"commenter{i}", password="testpass123")
+            models.Post.objects.create(profile=author.profile, title="Other post", content="Other content")
+            models.Comment.objects.create(post=self.post, author_profile=author.profile, content=f"Comment {i}")
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.comment_url, {"limit": 20})
+        self.assertEqual(len(response.data["results"]), 20)
+        self.assertEqual(response.data["results"][0]["author_profile"]["username"], "commenter0")
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.comment_url, {"limit": 20, "cursor": response.data["next"]})
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_list_comments_not_modified(self):
+        """Test the comment list is answered with 304 until a comment or the summary of one of the authors changes"""
+        comment = models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content="Comment 1")
+        etag = self.client.get(self.comment_url)["ETag"]
+
+        response = self.client.get(self.comment_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        comment.content = "Edited"
+        comment.save()
+        response = self.client.get(self.comment_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        # The author summary shows neither the biography nor the posts of the author
+        self.user.profile.biography = "New biography"
+        self.user.profile.save()
+        models.Post.objects.create(profile=self.user.profile, title="Another Post", content="")
+        response = self.client.get(self.comment_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.user.profile.profile_picture = models.Image.objects.create(type="PNG", data=b"\x89PNG\r\n\x1a\n")
+        self.user.profile.save()
+        response = self.client.get(self.comment_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["author_profile"]["profile_picture"], self.user.profile.profile_picture_id)
+        etag = response["ETag"]
+
+        self.user.username = "renamed"
+        self.user.save()
+        response = self.client.get(self.comment_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_comments_sparse_fields(self):
+        """Test comments without their author are listed without loading the authors"""
+        for content in ["Comment 1", "Comment 2"]:
+            models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content=content)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.comment_url, {"fields": "content"})
+        self.assertEqual(response.data["results"], [{"content": "Comment 1"}, {"content": "Comment 2"}])
+
+        response = self.client.get(self.comment_url, {"exclude": "author_profile.profile_picture"})
+        self.assertEqual(response.data["results"][0]["author_profile"], {"id": self.user.id, "username": "testuser"})
 
     def test_list_comments_post_not_found(self):
         """Test listing comments for a non-existent post"""
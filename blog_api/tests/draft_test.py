@@ -27,3 +27,16 @@ class DraftsViewTests(TestCase):
         self.client.force_authenticate(user=None)
         response = self.client.get(self.drafts_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_publish_draft(self):
+        draft = models.Post.objects.create(profile=self.user.profile, title="Draft", content="", draft=True)
+        self.assertIsNone(draft.published_at)
+
+        response = self.client.post(f"/api/drafts/{draft.id}/publish/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["draft"])
+        self.assertIsNotNone(response.data["published_at"])
+
+        draft.refresh_from_db()
+        self.assertFalse(draft.draft)
+        self.assertIsNotNone(draft.published_at)
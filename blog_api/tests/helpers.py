@@ -0,0 +1,40 @@
+import base64
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def crafted_cursor(ordering: list[str], values: list) -> str:
+    """A well-formed cursor with arbitrary values, as a client could send it"""
+    return base64.urlsafe_b64encode(json.dumps({"o": ordering, "v": values}).encode()).decode()
+
+
+class QueryPlanMixin:
+    """Assertions on the SQLite query plans of the queries run by a request"""
+
+    def query_plan(self, sql: str) -> list[str]:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [detail for *_, detail in cursor.fetchall()]
+
+    def assertPagesSeekIndex(self, fetch_page, index: str):
+        """
+        Asserts the ordered query run by `fetch_page()`, and by `fetch_page(cursor)` with the returned
+        cursor, reads `index` in order instead of scanning the table and sorting the rows
+        """
+        cursor = None
+        for page in ["first", "next"]:
+            with CaptureQueriesContext(connection) as queries:
+                cursor = fetch_page(cursor)
+            ordered = [query["sql"] for query in queries.captured_queries if "ORDER BY" in query["sql"]]
+            self.assertTrue(ordered, f"No ordered query for the {page} page")
+            plan = self.query_plan(ordered[0])
+            with self.subTest(page=page, plan=plan):
+                self.assertTrue(any(f"USING INDEX {index}" in step for step in plan))
+                self.assertFalse(any("TEMP B-TREE" in step for step in plan))
+                self.assertFalse(any(step.startswith("SCAN") and "INDEX" not in step for step in plan))
+                if page == "next":
+                    self.assertTrue(any(step.startswith("SEARCH") and index in step for step in plan))
+            if page == "first":
+                self.assertIsNotNone(cursor, "The first page must not be the last one")
@@ -1,8 +1,44 @@
-from django.test import TestCase
+import base64
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from blog_api import models
+from blog_api import blobstore, imaging, models, processing, ranges, uploads, variants
 from django.http import FileResponse
+from PIL import ExifTags, Image as PILImage, ImageOps, PngImagePlugin
+
+
+class TempImageStorageMixin:
+    """Stores image blobs and variants in a temporary directory `self.storage`, removed after each test"""
+    # Further settings overridden for the tests of the class
+    image_settings = {}
+
+    def setUp(self):
+        super().setUp()
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        self.storage = storage.name
+        self.variant_root = os.path.join(storage.name, "variants")
+        settings_override = override_settings(
+            IMAGE_STORAGE_ROOT=os.path.join(storage.name, "images"),
+            IMAGE_VARIANT_ROOT=self.variant_root,
+            **self.image_settings,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
 
 
 class ImageViewTests(TestCase):
@@ -173,3 +209,926 @@ class ImageViewTests(TestCase):
         # Test very large ID
         response = self.client.get("/api/image/999999999")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImageCachingTests(TempImageStorageMixin, TestCase):
+    """Test images are cached by clients and revalidated with their ETag."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.image = models.Image.objects.store("PNG", [b'\x89PNG\r\n\x1a\n'])
+        self.legacy_image = models.Image.objects.create(type="PNG", data=b'\x89PNG\r\n\x1a\n')
+
+    def test_immutable_cache_headers(self):
+        """Test images are served with an immutable Cache-Control and their content hash as ETag"""
+        response = self.client.get(f"/api/image/{self.image.id}")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], f'"{self.image.sha256}"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        response.close()
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching If-None-Match is answered with 304 without reading the image bytes"""
+        for image in [self.image, self.legacy_image]:
+            response = self.client.get(f"/api/image/{image.id}")
+            etag = response["ETag"]
+            response.close()
+
+            with self.assertNumQueries(1) as context:
+                response = self.client.get(f"/api/image/{image.id}", HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+            self.assertIn("immutable", response["Cache-Control"])
+            self.assertNotIn('"data"', context.captured_queries[0]["sql"])
+
+    def test_if_none_match_mismatch(self):
+        """Test a different If-None-Match returns the image"""
+        response = self.client.get(f"/api/image/{self.image.id}", HTTP_IF_NONE_MATCH='"other"')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response.close()
+
+
+class ImageBlobStoreTests(TempImageStorageMixin, TestCase):
+    """Test image bytes are kept in the content-addressed blob store."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.data = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+    def test_upload_writes_blob(self):
+        """Test uploaded bytes are stored under their hash and not in the database"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/api/image/", {"type": "PNG", "data": base64.b64encode(self.data).decode()}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        image = models.Image.objects.get(pk=response.data["id"])
+        self.assertIsNone(image.data)
+        self.assertEqual(image.size, len(self.data))
+        path = blobstore.blob_path(image.sha256)
+        self.assertEqual(path.relative_to(path.parents[2]).parts[:2], (image.sha256[:2], image.sha256[2:4]))
+        self.assertEqual(path.read_bytes(), self.data)
+
+    def test_serves_blob_from_open_file(self):
+        """Test images are served from the blob file"""
+        image = models.Image.objects.store("PNG", [self.data[:10], self.data[10:]])
+
+        response = self.client.get(f"/api/image/{image.id}")
+
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response["Content-Length"], str(len(self.data)))
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        response.close()
+
+    def test_move_image_blobs_command(self):
+        """Test images stored in the database are moved to the blob store"""
+        legacy = models.Image.objects.create(type="PNG", data=self.data)
+
+        call_command("move_image_blobs", stdout=StringIO())
+
+        legacy.refresh_from_db()
+        self.assertIsNone(legacy.data)
+        self.assertEqual(legacy.size, len(self.data))
+        self.assertEqual(blobstore.blob_path(legacy.sha256).read_bytes(), self.data)
+        response = self.client.get(f"/api/image/{legacy.id}")
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        response.close()
+
+
+class ImageUploadTests(TempImageStorageMixin, TestCase):
+    """Test raw, multipart and base64 image uploads."""
+    image_settings = {"IMAGE_MAX_UPLOAD_SIZE": 1000}
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.png = b'\x89PNG\r\n\x1a\n' + b'\x02' * 500
+
+    def assert_stored(self, response, type, data):
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = models.Image.objects.get(pk=response.data["id"])
+        self.assertEqual(image.type, type)
+        self.assertEqual(blobstore.blob_path(image.sha256).read_bytes(), data)
+
+    def assert_nothing_stored(self):
+        self.assertFalse(models.Image.objects.exists())
+        self.assertEqual([name for _, _, names in os.walk(self.storage) for name in names], [])
+
+    def test_raw_upload(self):
+        """Test uploading the image as the request body with its content type"""
+        response = self.client.post("/api/image/", self.png, content_type="image/png")
+
+        self.assert_stored(response, "PNG", self.png)
+
+    def test_raw_svg_upload(self):
+        """Test uploading an SVG image with an XML declaration"""
+        svg = b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg"><rect/></svg>'
+
+        response = self.client.post("/api/image/", svg, content_type="image/svg+xml")
+
+        self.assert_stored(response, "SVG", svg)
+
+    def test_multipart_upload(self):
+        """Test uploading the image as a file of a multipart form"""
+        file = SimpleUploadedFile("image.png", self.png, content_type="image/png")
+
+        response = self.client.post("/api/image/", {"file": file}, format="multipart")
+
+        self.assert_stored(response, "PNG", self.png)
+
+    def test_multipart_upload_without_file(self):
+        """Test a multipart upload without file returns 400"""
+        response = self.client.post("/api/image/", {"type": "PNG"}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_content_not_matching_type(self):
+        """Test content whose magic bytes do not match the image type is rejected"""
+        responses = [
+            self.client.post("/api/image/", self.png, content_type="image/jpeg"),
+            self.client.post("/api/image/", b"GIF89a" + b"\x00" * 10, content_type="image/png"),
+            self.client.post("/api/image/", {"type": "SVG", "data": base64.b64encode(self.png).decode()}, format="json"),
+        ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assert_nothing_stored()
+
+    def test_too_large(self):
+        """Test images larger than the limit are rejected"""
+        data = self.png + b'\x00' * 1000
+        responses = [
+            self.client.post("/api/image/", data, content_type="image/png"),
+            self.client.post("/api/image/", {"type": "PNG", "data": base64.b64encode(data).decode()}, format="json"),
+        ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assert_nothing_stored()
+
+    def test_validation_stops_reading(self):
+        """Test validation fails on the first chunk without reading the rest"""
+        read = []
+
+        def chunks():
+            for chunk in [b"GIF89a" + b"\x00" * uploads.SNIFF_LENGTH, b"\x00", b"\x00"]:
+                read.append(chunk)
+                yield chunk
+
+        with self.assertRaises(uploads.UploadError):
+            list(uploads.validated(chunks(), "PNG"))
+        self.assertEqual(len(read), 1)
+
+    def test_sniff(self):
+        """Test image types are recognized from their first bytes"""
+        self.assertEqual(uploads.sniff(b'\x89PNG\r\n\x1a\n'), "PNG")
+        self.assertEqual(uploads.sniff(b'\xff\xd8\xff\xe0'), "JPEG")
+        self.assertEqual(uploads.sniff(b'\xef\xbb\xbf  <svg>'), "SVG")
+        self.assertIsNone(uploads.sniff(b'<html>'))
+
+
+class ImageDeduplicationTests(TempImageStorageMixin, TestCase):
+    """Test identical images are stored once."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.data = b'\x89PNG\r\n\x1a\n' + b'\x01' * 100
+
+    def upload(self):
+        response = self.client.post("/api/image/", {"type": "PNG", "data": base64.b64encode(self.data).decode()}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def test_identical_upload_returns_existing_image(self):
+        """Test uploading the same content twice returns the same image"""
+        self.client.force_authenticate(user=self.user)
+
+        first_id = self.upload()
+        second_id = self.upload()
+
+        self.assertEqual(first_id, second_id)
+        self.assertEqual(models.Image.objects.count(), 1)
+
+    def test_same_content_different_type(self):
+        """Test the same content with another type is a different image"""
+        png = models.Image.objects.store("PNG", [self.data])
+        jpeg = models.Image.objects.store("JPEG", [self.data])
+
+        self.assertNotEqual(png.id, jpeg.id)
+
+    def test_unique_constraint(self):
+        """Test the database rejects a second image with the same hash and type"""
+        image = models.Image.objects.store("PNG", [self.data])
+
+        with self.assertRaises(IntegrityError):
+            models.Image.objects.create(type="PNG", sha256=image.sha256, size=image.size)
+
+    def test_merge_duplicate_images_command(self):
+        """Test duplicates still stored in the database are merged and their users repointed"""
+        original = models.Image.objects.create(type="PNG", data=self.data)
+        duplicate = models.Image.objects.create(type="PNG", data=self.data)
+        other_type = models.Image.objects.create(type="JPEG", data=self.data)
+        post = models.Post.objects.create(profile=self.user.profile, title="Post", image=duplicate)
+        profile = self.user.profile
+        profile.profile_picture = duplicate
+        profile.save()
+        profile.refresh_from_db()
+        post_version, profile_version = post.version, profile.version
+
+        out = StringIO()
+        call_command("merge_duplicate_images", stdout=out)
+
+        self.assertIn("Merged 1 duplicate images", out.getvalue())
+        self.assertEqual(set(models.Image.objects.values_list("id", flat=True)), {original.id, other_type.id})
+        post.refresh_from_db()
+        profile.refresh_from_db()
+        self.assertEqual(post.image_id, original.id)
+        self.assertEqual(profile.profile_picture_id, original.id)
+        self.assertGreater(post.version, post_version)
+        self.assertGreater(profile.version, profile_version)
+
+    def test_move_merges_into_stored_image(self):
+        """Test moving an image identical to one in the blob store merges it"""
+        stored = models.Image.objects.store("PNG", [self.data])
+        legacy = models.Image.objects.create(type="PNG", data=self.data)
+        post = models.Post.objects.create(profile=self.user.profile, title="Post", image=legacy)
+
+        call_command("move_image_blobs", stdout=StringIO())
+
+        self.assertFalse(models.Image.objects.filter(pk=legacy.id).exists())
+        post.refresh_from_db()
+        self.assertEqual(post.image_id, stored.id)
+
+
+class ImageVariantTests(TempImageStorageMixin, TestCase):
+    """Test resized variants of images generated on demand."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        png = BytesIO()
+        PILImage.new("RGB", (200, 100), "red").save(png, format="PNG")
+        self.image = models.Image.objects.store("PNG", [png.getvalue()])
+        self.url = f"/api/image/{self.image.id}"
+
+    def get_size(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with PILImage.open(BytesIO(b"".join(response.streaming_content))) as image:
+            return image.size
+
+    def test_snap(self):
+        """Test requested sizes are rounded up to the variant sizes"""
+        self.assertEqual(variants.snap(1), 40)
+        self.assertEqual(variants.snap(40), 40)
+        self.assertEqual(variants.snap(41), 80)
+        self.assertEqual(variants.snap(100000), variants.VARIANT_SIZES[-1])
+
+    def test_contain(self):
+        """Test the image is scaled down to fit within the snapped size keeping its aspect ratio"""
+        self.assertEqual(self.get_size(f"{self.url}?w=100"), (160, 80))
+        self.assertEqual(self.get_size(f"{self.url}?h=30"), (80, 40))
+
+    def test_cover(self):
+        """Test the image is scaled and cropped to fill the snapped size"""
+        self.assertEqual(self.get_size(f"{self.url}?w=40&h=40&fit=cover"), (40, 40))
+
+    def test_never_scaled_up(self):
+        """Test variants larger than the image keep the original size"""
+        self.assertEqual(self.get_size(f"{self.url}?w=1000"), (200, 100))
+        self.assertEqual(self.get_size(f"{self.url}?w=1000&h=1000&fit=cover"), (100, 100))
+
+    def test_variant_cached(self):
+        """Test a variant is generated once and then served from the cache"""
+        self.get_size(f"{self.url}?w=40")
+
+        with patch("blog_api.imaging.load") as load:
+            self.assertEqual(self.get_size(f"{self.url}?w=33"), (40, 20))
+        load.assert_not_called()
+
+    def test_variant_caching_headers(self):
+        """Test variants have their own ETag and the same caching headers as originals"""
+        original = self.client.get(self.url)
+        response = self.client.get(f"{self.url}?w=40")
+        original.close()
+        response.close()
+
+        self.assertNotEqual(response["ETag"], original["ETag"])
+        self.assertIn("immutable", response["Cache-Control"])
+        with patch("blog_api.imaging.load") as load:
+            response = self.client.get(f"{self.url}?w=40", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        load.assert_not_called()
+
+    def test_invalid_parameters(self):
+        """Test invalid variant parameters return 400"""
+        for query in ["w=0", "w=abc", "h=-5", "w=40&fit=stretch", "w=40&fit=cover"]:
+            with self.subTest(query=query):
+                response = self.client.get(f"{self.url}?{query}")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("error", response.data)
+
+    def test_svg_and_invalid_images_served_as_uploaded(self):
+        """Test images which cannot be resized are returned unchanged"""
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><rect/></svg>'
+        broken = b'\x89PNG\r\n\x1a\n'
+        for type, data in [("SVG", svg), ("PNG", broken)]:
+            image = models.Image.objects.store(type, [data])
+            response = self.client.get(f"/api/image/{image.id}?w=40")
+            self.assertEqual(b"".join(response.streaming_content), data)
+
+    def test_invalid_image_decoded_once(self):
+        """Test a failure to decode is cached, other variants of the image do not decode it again"""
+        image = models.Image.objects.store("PNG", [b'\x89PNG\r\n\x1a\n'])
+        self.client.get(f"/api/image/{image.id}?w=40").close()
+
+        with patch("blog_api.imaging.load") as load:
+            for query in ["w=40", "w=80", "h=40"]:
+                response = self.client.get(f"/api/image/{image.id}?{query}")
+                self.assertEqual(b"".join(response.streaming_content), b'\x89PNG\r\n\x1a\n')
+        load.assert_not_called()
+
+    def test_image_recorded_invalid_not_decoded(self):
+        """Test images which processing found not to decode are not decoded for variants"""
+        models.Image.objects.filter(pk=self.image.pk).update(valid=False)
+
+        with patch("blog_api.imaging.load") as load:
+            response = self.client.get(f"{self.url}?w=40")
+            response.close()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        load.assert_not_called()
+
+    def test_evict_least_recently_used(self):
+        """Test eviction deletes the least recently used variants first"""
+        self.get_size(f"{self.url}?w=40")
+        self.get_size(f"{self.url}?w=80")
+        paths = sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(self.variant_root) if not directory.endswith("tmp")
+            for name in names
+        )
+        small, large = sorted(paths, key=os.path.getsize)
+        os.utime(large, (1, 1))
+        self.get_size(f"{self.url}?w=40")
+
+        variants.evict(max_size=os.path.getsize(small))
+
+        self.assertTrue(os.path.exists(small))
+        self.assertFalse(os.path.exists(large))
+
+    def test_cache_scanned_only_when_full(self):
+        """Test the cache is scanned to learn its size, and then again only once it grows beyond its limit"""
+        with patch("blog_api.variants.os.scandir", wraps=os.scandir) as scandir:
+            self.get_size(f"{self.url}?w=40")
+            scans = scandir.call_count
+            self.assertGreater(scans, 0)
+
+            self.get_size(f"{self.url}?w=80")
+            self.assertEqual(scandir.call_count, scans)
+
+            with self.settings(IMAGE_VARIANT_CACHE_SIZE=1):
+                self.assertEqual(self.get_size(f"{self.url}?w=160"), (160, 80))
+            self.assertGreater(scandir.call_count, scans)
+
+        self.assertEqual([name for _, _, names in os.walk(self.variant_root) for name in names], [])
+
+
+class ImageRangeTests(TempImageStorageMixin, TestCase):
+    """Test Range requests for images."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.data = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+        self.image = models.Image.objects.store("PNG", [self.data])
+        self.url = f"/api/image/{self.image.id}"
+        self.etag = f'"{self.image.sha256}"'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_accept_ranges(self):
+        """Test full responses advertise range support"""
+        response, content = self.get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(content, self.data)
+
+    def test_single_range(self):
+        """Test a single range returns 206 with the requested bytes"""
+        for header, first, last in [("bytes=0-7", 0, 7), ("bytes=100-", 100, len(self.data) - 1), ("bytes=-10", len(self.data) - 10, len(self.data) - 1)]:
+            with self.subTest(header=header):
+                response, content = self.get(HTTP_RANGE=header)
+
+                self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+                self.assertEqual(response["Content-Range"], f"bytes {first}-{last}/{len(self.data)}")
+                self.assertEqual(response["Content-Length"], str(last - first + 1))
+                self.assertEqual(response["Content-Type"], "image/PNG")
+                self.assertEqual(response["ETag"], self.etag)
+                self.assertEqual(content, self.data[first:last + 1])
+
+    def test_multiple_ranges(self):
+        """Test several ranges return a multipart/byteranges body"""
+        response, content = self.get(HTTP_RANGE="bytes=0-3, 500-509")
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        content_type, _, boundary = response["Content-Type"].partition("; boundary=")
+        self.assertEqual(content_type, "multipart/byteranges")
+        self.assertEqual(response["Content-Length"], str(len(content)))
+        parts = content.split(f"--{boundary}".encode())
+        self.assertEqual(len(parts), 4)
+        self.assertIn(f"Content-Range: bytes 0-3/{len(self.data)}".encode(), parts[1])
+        self.assertTrue(parts[1].endswith(b"\r\n\r\n" + self.data[0:4] + b"\r\n"))
+        self.assertTrue(parts[2].endswith(b"\r\n\r\n" + self.data[500:510] + b"\r\n"))
+        self.assertEqual(parts[3], b"--\r\n")
+
+    def test_unsatisfiable_range(self):
+        """Test a range beyond the end of the image returns 416"""
+        response, _ = self.get(HTTP_RANGE=f"bytes={len(self.data)}-")
+
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_invalid_range_ignored(self):
+        """Test an invalid Range header returns the whole image"""
+        for header in ["items=0-1", "bytes=5-1", "bytes=abc", "bytes=" + ",".join(["0-1"] * (ranges.MAX_RANGES + 1))]:
+            with self.subTest(header=header):
+                response, content = self.get(HTTP_RANGE=header)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(content, self.data)
+
+    def test_if_range(self):
+        """Test Range is only honored when If-Range matches the ETag"""
+        response, _ = self.get(HTTP_RANGE="bytes=0-7", HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+        response, content = self.get(HTTP_RANGE="bytes=0-7", HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content, self.data)
+
+    def test_parse_range_merges_overlapping(self):
+        """Test overlapping and adjacent ranges are merged"""
+        self.assertEqual(ranges.parse_range("bytes=10-20, 0-5, 15-30, 31-40", 100), [(0, 5), (10, 40)])
+        self.assertEqual(ranges.parse_range("bytes=0-1000", 100), [(0, 99)])
+        self.assertEqual(ranges.parse_range("bytes=-0", 100), [])
+
+
+class ImageDatabaseBlobTests(TestCase):
+    """Test images still stored in the database are read incrementally."""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.data = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 300
+        self.image = models.Image.objects.create(type="PNG", data=self.data)
+
+    def test_open_reads_blob_incrementally(self):
+        """Test bytes not loaded yet are opened with SQLite blob I/O"""
+        image = models.Image.objects.get(pk=self.image.id)
+
+        with image.open() as file:
+            self.assertIsInstance(file, models.SQLiteBlobReader)
+            self.assertEqual(file.read(8), self.data[:8])
+            self.assertEqual(file.seek(1000), 1000)
+            self.assertEqual(file.read(10), self.data[1000:1010])
+            self.assertEqual(file.seek(0, os.SEEK_END), len(self.data))
+            file.seek(0)
+            self.assertEqual(file.read(), self.data)
+
+    def test_blob_not_locked_between_reads(self):
+        """Test other connections can write to the database while an image is read, between two chunks"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "db.sqlite3")
+            reader_connection = sqlite3.connect(path, isolation_level=None)
+            self.addCleanup(reader_connection.close)
+            reader_connection.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, data BLOB)")
+            reader_connection.execute("INSERT INTO image VALUES (1, ?)", (self.data,))
+
+            with models.SQLiteBlobReader(reader_connection, "image", "data", 1) as file:
+                self.assertEqual(file.read(100), self.data[:100])
+                writer_connection = sqlite3.connect(path, timeout=0, isolation_level=None)
+                self.addCleanup(writer_connection.close)
+                writer_connection.execute("INSERT INTO image VALUES (2, x'00')")
+                self.assertEqual(file.read(), self.data[100:])
+
+    def test_open_loaded_data(self):
+        """Test bytes which are already loaded are not read again"""
+        with models.Image.objects.defer(None).get(pk=self.image.id).open() as file:
+            self.assertIsInstance(file, BytesIO)
+            self.assertEqual(file.read(), self.data)
+
+    def test_open_null_data(self):
+        """Test an image without bytes opens as empty"""
+        models.Image.objects.filter(pk=self.image.id).update(data=None)
+        image = models.Image.objects.get(pk=self.image.id)
+
+        with image.open() as file:
+            self.assertEqual(file.read(), b"")
+
+    def test_serve_without_loading_data(self):
+        """Test serving the image does not select the data column and streams it in chunks"""
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(f"/api/image/{self.image.id}")
+        chunks = list(response.streaming_content)
+        response.close()
+
+        self.assertNotIn('"data"', context.captured_queries[0]["sql"])
+        self.assertEqual(response["Content-Length"], str(len(self.data)))
+        self.assertEqual(b"".join(chunks), self.data)
+        self.assertLessEqual(max(map(len, chunks)), ranges.READ_CHUNK_SIZE)
+
+    def test_range_seeks_in_blob(self):
+        """Test Range requests read only the requested bytes of the blob"""
+        response = self.client.get(f"/api/image/{self.image.id}", HTTP_RANGE="bytes=70000-70009")
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), self.data[70000:70010])
+        response.close()
+
+
+class ImageProcessingTests(TempImageStorageMixin, TestCase):
+    """Test uploaded images are verified and optimized in the background."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+
+        # Uncompressed and with a text chunk
+        self.pixels = PILImage.new("RGB", (64, 32), "blue")
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Comment", "x" * 1000)
+        png = BytesIO()
+        self.pixels.save(png, format="PNG", compress_level=0, pnginfo=info)
+        self.png = png.getvalue()
+
+    def test_upload_schedules_processing(self):
+        """Test the upload returns before the image is processed in the worker pool"""
+        self.client.force_authenticate(user=self.user)
+
+        with patch("blog_api.imaging.executor") as executor, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/image/", self.png, content_type="image/png")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(models.Image.objects.get(pk=response.data["id"]).processed)
+        executor.return_value.submit.assert_called_once_with(processing._run, response.data["id"])
+
+    def test_png_recompressed(self):
+        """Test PNGs are recompressed losslessly and the original blob is replaced"""
+        image = models.Image.objects.store("PNG", [self.png])
+        original_sha256 = image.sha256
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertTrue(image.processed)
+        self.assertEqual((image.width, image.height), (64, 32))
+        self.assertLess(image.size, len(self.png))
+        self.assertEqual(image.original_sha256, original_sha256)
+        self.assertFalse(blobstore.blob_path(original_sha256).exists())
+        with PILImage.open(image.open()) as optimized:
+            self.assertEqual(optimized.tobytes(), self.pixels.tobytes())
+            self.assertNotIn("Comment", optimized.info)
+
+    def test_jpeg_metadata_stripped(self):
+        """Test JPEG metadata is removed without re-encoding the pixels, keeping the orientation and color profile"""
+        exif = PILImage.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        exif[ExifTags.Base.ImageDescription] = "x" * 2000
+        jpeg = BytesIO()
+        PILImage.new("RGB", (40, 20), "white").save(
+            jpeg, format="JPEG", exif=exif, comment="x" * 100, icc_profile=b"profile"
+        )
+        image = models.Image.objects.store("JPEG", [jpeg.getvalue()])
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (20, 40))
+        self.assertLess(image.size, len(jpeg.getvalue()))
+        with PILImage.open(image.open()) as optimized, PILImage.open(jpeg) as original:
+            self.assertEqual(dict(optimized.getexif()), {ExifTags.Base.Orientation: 6})
+            self.assertNotIn("comment", optimized.info)
+            self.assertEqual(optimized.info["icc_profile"], b"profile")
+            self.assertEqual(optimized.tobytes(), original.tobytes())
+            self.assertEqual(ImageOps.exif_transpose(optimized).size, (20, 40))
+
+    def test_low_quality_jpeg_not_reencoded(self):
+        """Test stripping the metadata of a low quality JPEG keeps its quality and never makes it larger"""
+        exif = PILImage.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        exif[ExifTags.Base.Make] = "Camera"
+        jpeg = BytesIO()
+        PILImage.effect_noise((200, 100), 64).convert("RGB").save(jpeg, format="JPEG", quality=40, exif=exif)
+        image = models.Image.objects.store("JPEG", [jpeg.getvalue()])
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertLess(image.size, len(jpeg.getvalue()))
+        with PILImage.open(image.open()) as optimized, PILImage.open(jpeg) as original:
+            self.assertEqual(dict(optimized.getexif()), {ExifTags.Base.Orientation: 6})
+            self.assertEqual(optimized.tobytes(), original.tobytes())
+
+    def test_jpeg_without_metadata_kept(self):
+        """Test a JPEG without metadata is kept as uploaded"""
+        jpeg = BytesIO()
+        self.pixels.save(jpeg, format="JPEG")
+        image = models.Image.objects.store("JPEG", [jpeg.getvalue()])
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertTrue(image.processed)
+        self.assertEqual((image.width, image.height), (64, 32))
+        self.assertEqual(image.sha256, hashlib.sha256(jpeg.getvalue()).hexdigest())
+        self.assertEqual(image.original_sha256, "")
+
+    def test_jpeg_metadata_stripped_without_saving_space(self):
+        """Test JPEG metadata is removed even when the optimized image is not smaller"""
+        exif = PILImage.Exif()
+        exif[ExifTags.Base.Make] = "Camera"
+        jpeg = BytesIO()
+        PILImage.effect_noise((200, 100), 64).convert("RGB").save(jpeg, format="JPEG", quality=95, exif=exif)
+        image = models.Image.objects.store("JPEG", [jpeg.getvalue()])
+        models.Image.objects.filter(pk=image.pk).update(size=1)
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertEqual(image.original_sha256, hashlib.sha256(jpeg.getvalue()).hexdigest())
+        with PILImage.open(image.open()) as optimized:
+            self.assertEqual(len(optimized.getexif()), 0)
+
+    def test_invalid_image_kept(self):
+        """Test content which does not decode as its type is marked invalid and kept unchanged"""
+        data = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+        image = models.Image.objects.store("PNG", [data])
+
+        processing.process_image(image.id)
+
+        image.refresh_from_db()
+        self.assertTrue(image.processed)
+        self.assertFalse(image.valid)
+        self.assertIsNone(image.width)
+        with image.open() as file:
+            self.assertEqual(file.read(), data)
+
+    def test_image_replaced_while_served(self):
+        """Test an image whose blob is replaced after its row was loaded is served from the new blob"""
+        image = models.Image.objects.store("PNG", [self.png])
+        stale = models.Image.objects.get(pk=image.id)
+        processing.process_image(image.id)
+        image.refresh_from_db()
+
+        with patch.object(models.Image.objects, "get", return_value=stale):
+            response = self.client.get(f"/api/image/{image.id}")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], f'"{image.sha256}"')
+        with image.open() as file:
+            self.assertEqual(b"".join(response.streaming_content), file.read())
+        response.close()
+
+    def test_reupload_of_optimized_image(self):
+        """Test uploading the original bytes of an optimized image returns that image"""
+        image = models.Image.objects.store("PNG", [self.png])
+        processing.process_image(image.id)
+
+        self.assertEqual(models.Image.objects.store("PNG", [self.png]).id, image.id)
+        self.assertEqual(models.Image.objects.count(), 1)
+
+    def test_process_images_command(self):
+        """Test the command processes the images left unprocessed"""
+        image = models.Image.objects.store("PNG", [self.png])
+        out = StringIO()
+
+        call_command("process_images", stdout=out)
+
+        image.refresh_from_db()
+        self.assertTrue(image.processed)
+        self.assertTrue(image.valid)
+        self.assertIn("Processed 1 images", out.getvalue())
+        self.assertIn("0 do not decode", out.getvalue())
+
+
+class ImageFormatNegotiationTests(TempImageStorageMixin, TestCase):
+    """Test images are converted to formats the client accepts."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client = APIClient()
+        png = BytesIO()
+        PILImage.effect_noise((200, 100), 64).convert("RGB").save(png, format="PNG")
+        self.png = png.getvalue()
+        self.image = models.Image.objects.store("PNG", [self.png])
+        self.url = f"/api/image/{self.image.id}"
+
+    def get(self, url, accept):
+        response = self.client.get(url, HTTP_ACCEPT=accept)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b"".join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_accepted_format(self):
+        """Test only explicitly accepted formats are selected, in order of preference"""
+        self.assertEqual(variants.accepted_format("image/webp,*/*"), "WEBP")
+        self.assertEqual(variants.accepted_format("image/avif,image/webp,image/*"), imaging.DERIVATIVE_FORMATS[0])
+        self.assertIsNone(variants.accepted_format("image/webp;q=0,image/*,*/*;q=0.8"))
+        self.assertIsNone(variants.accepted_format("*/*"))
+        self.assertIsNone(variants.accepted_format(""))
+
+    def test_webp_served_to_accepting_clients(self):
+        """Test clients accepting WebP get a smaller WebP image"""
+        response, content = self.get(self.url, "image/webp,*/*")
+
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("Accept", response["Vary"])
+        self.assertLess(len(content), len(self.png))
+        with PILImage.open(BytesIO(content)) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (200, 100)))
+
+    def test_original_served_to_other_clients(self):
+        """Test clients not accepting other formats get the original with another ETag"""
+        converted, _ = self.get(self.url, "image/webp")
+        response, content = self.get(self.url, "*/*")
+
+        self.assertEqual(response["Content-Type"], "image/PNG")
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual(content, self.png)
+        self.assertNotEqual(response["ETag"], converted["ETag"])
+
+    def test_resized_variant_converted(self):
+        """Test resized variants are converted as well"""
+        response, content = self.get(f"{self.url}?w=80", "image/webp")
+
+        self.assertEqual(response["Content-Type"], "image/webp")
+        with PILImage.open(BytesIO(content)) as image:
+            self.assertEqual(image.size, (80, 40))
+
+    def test_larger_conversion_not_served(self):
+        """Test the original is served when the converted image would be larger"""
+        encode = imaging.encode
+
+        def large_webp(image, format):
+            return b"x" * 10_000_000 if format == "WEBP" else encode(image, format)
+
+        with patch("blog_api.imaging.encode", side_effect=large_webp):
+            response, content = self.get(self.url, "image/webp")
+            resized, resized_content = self.get(f"{self.url}?w=80", "image/webp")
+        # The decision is cached
+        response, content = self.get(self.url, "image/webp")
+
+        self.assertEqual(response["Content-Type"], "image/PNG")
+        self.assertEqual(content, self.png)
+        self.assertEqual(resized["Content-Type"], "image/PNG")
+        with PILImage.open(BytesIO(resized_content)) as image:
+            self.assertEqual((image.format, image.size), ("PNG", (80, 40)))
+
+    def test_svg_not_negotiated(self):
+        """Test SVG images are served as they are without varying on Accept"""
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><rect/></svg>'
+        image = models.Image.objects.store("SVG", [svg])
+
+        response, content = self.get(f"/api/image/{image.id}", "image/webp")
+
+        self.assertEqual(content, svg)
+        self.assertNotIn("Accept", [header.strip() for header in response.get("Vary", "").split(",")])
+
+
+class ImageMetadataTests(TestCase):
+    """Test image metadata is read without the image bytes."""
+
+    def setUp(self):
+        """Set up test data"""
+        self.data = b'\x89PNG\r\n\x1a\n' + b'\x03' * 1000
+        self.image = models.Image.objects.create(type="PNG", data=self.data)
+
+    def assert_no_data_selected(self, context):
+        for query in context.captured_queries:
+            self.assertNotIn('"data"', query["sql"].split(" FROM ")[0])
+
+    def test_list_and_describe_without_bytes(self):
+        """Test listing, counting and describing images does not read their bytes"""
+        with self.assertNumQueries(2) as context:
+            images = list(models.Image.objects.all())
+            self.assertEqual(models.Image.objects.count(), 1)
+            self.assertEqual(str(images[0]), f"Image(type=PNG, size={len(self.data)})")
+        self.assert_no_data_selected(context)
+
+    def test_save_without_bytes(self):
+        """Test saving a loaded image neither reads nor overwrites its bytes"""
+        image = models.Image.objects.get(pk=self.image.id)
+
+        with self.assertNumQueries(1) as context:
+            image.width = 10
+            image.save()
+        self.assert_no_data_selected(context)
+
+        image.refresh_from_db()
+        self.assertEqual(image.size, len(self.data))
+        self.assertEqual(bytes(image.data), self.data)
+
+    def test_metadata_recorded(self):
+        """Test the upload time is recorded"""
+        self.assertIsNotNone(self.image.created_at)
+
+
+class OrphanCollectionTests(TempImageStorageMixin, TestCase):
+    """Test the gc_orphans command deletes unused images, hashtags and blobs."""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        user = User.objects.create_user(username="testuser", password="testpass123")
+        self.post_image = self.store(b"post")
+        self.avatar = self.store(b"avatar")
+        self.orphan = self.store(b"orphan")
+        self.recent_orphan = self.store(b"recent")
+        models.Image.objects.exclude(pk=self.recent_orphan.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        post = models.Post.objects.create(profile=user.profile, title="Post", image=self.post_image)
+        user.profile.profile_picture = self.avatar
+        user.profile.save()
+
+        self.used_tag = models.Hashtag.objects.create(value="used")
+        self.unused_tag = models.Hashtag.objects.create(value="unused")
+        post.tags.add(self.used_tag)
+
+        self.old_stray = blobstore.blob_path(blobstore.write_blob([b"old stray"])[0])
+        os.utime(self.old_stray, (time.time() - 3 * 24 * 3600,) * 2)
+        self.recent_stray = blobstore.blob_path(blobstore.write_blob([b"recent stray"])[0])
+
+    def store(self, content):
+        return models.Image.objects.store("PNG", [b'\x89PNG\r\n\x1a\n' + content])
+
+    def test_dry_run(self):
+        """Test a dry run only reports what would be deleted"""
+        out = StringIO()
+
+        call_command("gc_orphans", "--dry-run", stdout=out)
+
+        self.assertIn("Would delete 1 images, 1 hashtags and 1 stray blobs", out.getvalue())
+        self.assertEqual(models.Image.objects.count(), 4)
+        self.assertEqual(models.Hashtag.objects.count(), 2)
+        self.assertTrue(self.old_stray.exists())
+
+    def test_collects_orphans(self):
+        """Test unused images past the grace period, unused hashtags and stray blobs are deleted"""
+        out = StringIO()
+
+        call_command("gc_orphans", stdout=out)
+
+        self.assertEqual(
+            set(models.Image.objects.values_list("id", flat=True)),
+            {self.post_image.id, self.avatar.id, self.recent_orphan.id},
+        )
+        self.assertFalse(blobstore.blob_path(self.orphan.sha256).exists())
+        self.assertTrue(blobstore.blob_path(self.post_image.sha256).exists())
+        self.assertEqual(list(models.Hashtag.objects.all()), [self.used_tag])
+        self.assertFalse(self.old_stray.exists())
+        self.assertTrue(self.recent_stray.exists())
+        reclaimed = self.orphan.size + len(b"old stray")
+        self.assertIn(f"Deleted 1 images, 1 hashtags and 1 stray blobs, reclaimed {reclaimed} bytes", out.getvalue())
+
+    def test_grace_period(self):
+        """Test the grace period is configurable"""
+        call_command("gc_orphans", "--grace-hours", "0", stdout=StringIO())
+
+        self.assertFalse(models.Image.objects.filter(pk=self.recent_orphan.id).exists())
+        self.assertFalse(self.recent_stray.exists())
+
+    def test_shared_blob_kept(self):
+        """Test the blob of a deleted image is kept while an image of another type uses it"""
+        other_type = models.Image.objects.store("JPEG", [b'\x89PNG\r\n\x1a\n' + b"orphan"])
+        models.Post.objects.create(profile=models.Profile.objects.get(), title="Other", image=other_type)
+
+        call_command("gc_orphans", stdout=StringIO())
+
+        self.assertFalse(models.Image.objects.filter(pk=self.orphan.id).exists())
+        self.assertTrue(blobstore.blob_path(other_type.sha256).exists())
@@ -114,6 +114,14 @@ class LikeViewTests(TestCase):
         
         # Both likes should exist
         self.assertEqual(models.Like.objects.filter(post=self.post).count(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+
+        # Unliking decrements the counter again
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
     
     def test_user_isolation(self):
         """Test that like status is user-specific"""
@@ -1,4 +1,9 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.auth.models import User
 from blog_api import models
 
@@ -34,3 +39,137 @@ class ModelStringRepresentationTests(TestCase):
         )
         expected = f"Post(id={post.id}, profile={self.user.profile}, title=Test Post)"
         self.assertEqual(str(post), expected)
+
+
+class EngagementCounterTests(TestCase):
+    """Test the denormalized engagement counters on Post."""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.post = models.Post.objects.create(profile=self.user.profile, title="Test Post")
+
+    def test_adjust_counter_never_negative(self):
+        """Test decrementing a counter stops at zero"""
+        self.post.adjust_counter("like_count", 1)
+        self.assertEqual(self.post.like_count, 1)
+        self.post.adjust_counter("like_count", -2)
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_recount_engagement_repairs_drift(self):
+        """Test the recount command fixes counters which differ from the actual counts"""
+        models.Like.objects.create(post=self.post, liker_profile=self.user.profile)
+        models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content="Comment")
+        models.Post.objects.filter(pk=self.post.pk).update(bookmark_count=3)
+
+        call_command("recount_engagement", "--dry-run", stdout=StringIO())
+        self.assertEqual(models.Post.objects.with_counter_drift().count(), 1)
+
+        call_command("recount_engagement", stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.bookmark_count, 0)
+        self.assertFalse(models.Post.objects.with_counter_drift().exists())
+        self.assertAlmostEqual(self.post.hot_score, self.post.compute_hot_score(), places=3)
+
+    def test_save_keeps_counters(self):
+        """Test saving a stale instance does not overwrite counters changed in the meantime"""
+        stale = models.Post.objects.get(pk=self.post.pk)
+        self.post.adjust_counter("like_count", 1)
+
+        stale.title = "Edited"
+        stale.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "Edited")
+        self.assertEqual(self.post.like_count, 1)
+
+
+class HotScoreTests(TestCase):
+    """Test the time-decayed hot ranking of posts."""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+
+    def _create_post(self, age: timedelta, **kwargs):
+        return models.Post.objects.create(profile=self.user.profile, title="Post", published_at=timezone.now() - age, **kwargs)
+
+    def test_score_decays_with_age(self):
+        """Test newer posts outrank older posts with the same engagement"""
+        old = self._create_post(timedelta(days=2), like_count=5)
+        new = self._create_post(timedelta(hours=1), like_count=5)
+        draft = models.Post.objects.create(profile=self.user.profile, title="Draft", draft=True)
+
+        self.assertGreater(new.hot_score, old.hot_score)
+        self.assertEqual(draft.hot_score, 0)
+
+    def test_engagement_refreshes_score(self):
+        """Test engagement events raise the stored score"""
+        post = self._create_post(timedelta(hours=3))
+        before = post.hot_score
+
+        post.adjust_counter("comment_count", 1)
+
+        post.refresh_from_db()
+        self.assertGreater(post.hot_score, before)
+
+    def test_publish_sets_score(self):
+        """Test publishing a draft gives it a score"""
+        draft = models.Post.objects.create(profile=self.user.profile, title="Draft", draft=True)
+
+        draft.publish()
+
+        draft.refresh_from_db()
+        self.assertGreater(draft.hot_score, 0)
+
+    def test_refresh_hot_scores_command(self):
+        """Test the periodic job decays recent scores and drops old posts out of the ranking"""
+        recent = self._create_post(timedelta(days=1))
+        expired = self._create_post(timedelta(days=10))
+        models.Post.objects.filter(pk__in=[recent.pk, expired.pk]).update(hot_score=100)
+
+        call_command("refresh_hot_scores", stdout=StringIO())
+
+        recent.refresh_from_db()
+        expired.refresh_from_db()
+        self.assertAlmostEqual(recent.hot_score, recent.compute_hot_score(), places=3)
+        self.assertEqual(expired.hot_score, 0)
+
+
+class PostSummaryTests(TestCase):
+    """Test the stored excerpt, word count and reading time of posts."""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+
+    def test_summary_computed_on_save(self):
+        """Test saving a post summarizes its HTML content as plain text"""
+        post = models.Post.objects.create(
+            profile=self.user.profile, title="Post", content="<p>Fish &amp; <b>chips</b></p>\n<p>are   tasty</p>"
+        )
+        self.assertEqual(post.excerpt, "Fish & chips are tasty")
+        self.assertEqual(post.word_count, 5)
+        self.assertEqual(post.reading_time, 1)
+
+        post.content = "<p>" + "word " * (models.WORDS_PER_MINUTE * 2 + 1) + "</p>"
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, models.WORDS_PER_MINUTE * 2 + 1)
+        self.assertEqual(post.reading_time, 3)
+        self.assertLessEqual(len(post.excerpt), models.EXCERPT_LENGTH)
+        self.assertTrue(post.excerpt.endswith("…"))
+
+    def test_backfill_excerpts_command(self):
+        """Test the backfill command summarizes posts whose summary is missing or outdated"""
+        post = models.Post.objects.create(profile=self.user.profile, title="Post", content="<p>Some content</p>")
+        models.Post.objects.filter(pk=post.pk).update(excerpt="", word_count=0, reading_time=0)
+
+        out = StringIO()
+        call_command("backfill_excerpts", stdout=out)
+
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count, post.reading_time), ("Some content", 2, 1))
+        self.assertIn("1 posts", out.getvalue())
@@ -0,0 +1,225 @@
+import base64
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from blog_api import models
+from blog_api.tests.helpers import QueryPlanMixin, crafted_cursor
+
+
+class PostFilterViewTests(QueryPlanMixin, TestCase):
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpass123")
+
+        self.posts = [
+            models.Post.objects.create(profile=self.user.profile, title=f"Post {i}", content="", like_count=like_count)
+            for i, like_count in enumerate([3, 1, 3, 0, 2])
+        ]
+        models.Post.objects.create(profile=self.user.profile, title="Draft", content="", draft=True)
+
+        self.filter_url = "/api/filter/"
+
+    def _fetch_all(self, limit, **filters):
+        ids = []
+        cursor = None
+        while True:
+            response = self.client.post(self.filter_url, {"limit": limit, "cursor": cursor, **filters}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["post_ids"]), limit)
+            ids += response.data["post_ids"]
+            cursor = response.data["next"]
+            if cursor is None:
+                return ids
+
+    def _page_fetcher(self, limit, **filters):
+        def fetch_page(cursor):
+            response = self.client.post(self.filter_url, {"limit": limit, "cursor": cursor, **filters}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response.data["next"]
+        return fetch_page
+
+    def test_sort_by_date(self):
+        """Test posts are sorted newest first and drafts are excluded"""
+        response = self.client.post(self.filter_url, {"sort_by": "DATE"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["post_ids"], [post.id for post in reversed(self.posts)])
+        self.assertIsNone(response.data["next"])
+
+    def test_sort_by_likes_paginated(self):
+        """Test pages sorted by likes are consistent across ties"""
+        expected = [self.posts[i].id for i in [2, 0, 4, 1, 3]]
+
+        self.assertEqual(self._fetch_all(2, sort_by="LIKES"), expected)
+        self.assertEqual(self._fetch_all(1, sort_by="LIKES"), expected)
+
+    def test_sort_by_likes_pages_seek_index(self):
+        """Test pages sorted by likes are read from the likes index"""
+        self.assertPagesSeekIndex(self._page_fetcher(2, sort_by="LIKES"), "blog_api_post_likes_idx")
+
+    def test_sort_by_date_paginated(self):
+        """Test following the next cursor returns every post exactly once"""
+        self.assertEqual(self._fetch_all(2, sort_by="DATE"), [post.id for post in reversed(self.posts)])
+
+    def test_sort_by_date_pages_seek_index(self):
+        """Test pages sorted by date are read from the publication date index"""
+        self.assertPagesSeekIndex(self._page_fetcher(2, sort_by="DATE"), "blog_api_post_published_idx")
+
+    def test_cursor_of_other_sorting_rejected(self):
+        """Test a cursor cannot be reused with a different sorting method"""
+        response = self.client.post(self.filter_url, {"limit": 1, "sort_by": "DATE"}, format='json')
+        cursor = response.data["next"]
+
+        response = self.client.post(self.filter_url, {"cursor": cursor, "sort_by": "LIKES"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Invalid cursor", response.data["error"])
+
+    def test_cursor_with_invalid_values_rejected(self):
+        """Test well-formed cursors with null or non-finite values are rejected"""
+        cursors = {
+            "DATE": crafted_cursor(["-published_at", "-id"], [None, 1]),
+            "LIKES": crafted_cursor(["-like_count", "-id"], [None, 1]),
+            "HOT": crafted_cursor(["-hot_score", "-id"], [1.5, None]),
+        }
+        for sort_by, cursor in cursors.items():
+            with self.subTest(sort_by=sort_by):
+                response = self.client.post(self.filter_url, {"cursor": cursor, "sort_by": sort_by}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        cursor = base64.urlsafe_b64encode(b'{"o": ["-hot_score", "-id"], "v": [NaN, 1]}').decode()
+        response = self.client.post(self.filter_url, {"cursor": cursor, "sort_by": "HOT"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_author(self):
+        """Test filtering by author name"""
+        other_post = models.Post.objects.create(profile=self.other_user.profile, title="Other", content="")
+
+        response = self.client.post(self.filter_url, {"author_name": "OtherUser"}, format='json')
+
+        self.assertEqual(response.data["post_ids"], [other_post.id])
+
+    def test_keyword_search(self):
+        """Test keywords match substrings of title or content case-insensitively, all keywords must match"""
+        django = models.Post.objects.create(profile=self.user.profile, title="Learning Django", content="Models and views")
+        react = models.Post.objects.create(profile=self.user.profile, title="React", content="Hooks and djangoesque views")
+
+        response = self.client.post(self.filter_url, {"keywords": ["DJANGO"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [react.id, django.id])
+
+        response = self.client.post(self.filter_url, {"keywords": ["django", "hooks"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [react.id])
+
+        # Keywords too short for the full-text index
+        response = self.client.post(self.filter_url, {"keywords": ["ho", "views"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [react.id])
+
+    def test_keyword_search_follows_updates(self):
+        """Test the search index is updated when posts are edited or deleted"""
+        post = models.Post.objects.create(profile=self.user.profile, title="Before", content="")
+
+        post.title = "After"
+        post.save()
+        response = self.client.post(self.filter_url, {"keywords": ["before"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [])
+        response = self.client.post(self.filter_url, {"keywords": ["after"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [post.id])
+
+        post.delete()
+        response = self.client.post(self.filter_url, {"keywords": ["after"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [])
+
+    def test_keyword_search_quotes(self):
+        """Test full-text query syntax in keywords is matched literally"""
+        post = models.Post.objects.create(profile=self.user.profile, title='Say "hello" OR NOT', content="")
+
+        response = self.client.post(self.filter_url, {"keywords": ['"hello" OR']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["post_ids"], [post.id])
+
+    def test_sort_by_relevance(self):
+        """Test relevance sorting ranks better matches first and pages consistently"""
+        weak = models.Post.objects.create(profile=self.user.profile, title="Notes", content="python " + "filler " * 50)
+        strong = models.Post.objects.create(profile=self.user.profile, title="Python", content="python python")
+        models.Post.objects.create(profile=self.user.profile, title="Unrelated", content="")
+
+        response = self.client.post(self.filter_url, {"keywords": ["python"], "sort_by": "RELEVANCE"}, format='json')
+        self.assertEqual(response.data["post_ids"], [strong.id, weak.id])
+        self.assertEqual(self._fetch_all(1, keywords=["python"], sort_by="RELEVANCE"), [strong.id, weak.id])
+
+        # Without keywords there is nothing to rank, newest posts come first
+        response = self.client.post(self.filter_url, {"sort_by": "RELEVANCE", "limit": 1}, format='json')
+        self.assertEqual(response.data["post_ids"], [models.Post.objects.filter(draft=False).latest("id").id])
+
+    def test_filter_by_tags(self):
+        """Test every requested tag must be present, matched case-insensitively"""
+        django = models.Hashtag.objects.create(value="Django")
+        python = models.Hashtag.objects.create(value="python")
+        both = models.Post.objects.create(profile=self.user.profile, title="Both", content="")
+        both.tags.set([django, python])
+        only_django = models.Post.objects.create(profile=self.user.profile, title="Django", content="")
+        only_django.tags.set([django])
+
+        self.assertEqual(django.value, "django")
+
+        response = self.client.post(self.filter_url, {"tags": ["DJANGO"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [only_django.id, both.id])
+
+        response = self.client.post(self.filter_url, {"tags": ["django", "Python"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [both.id])
+
+        response = self.client.post(self.filter_url, {"tags": ["django", "unknown"]}, format='json')
+        self.assertEqual(response.data["post_ids"], [])
+
+    def test_filter_by_publication_date(self):
+        """Test the publication date range is inclusive at the start and exclusive at the end"""
+        old = models.Post.objects.create(profile=self.user.profile, title="Old", content="",
+                                         published_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        new = models.Post.objects.create(profile=self.user.profile, title="New", content="",
+                                         published_at=datetime(2024, 6, 1, tzinfo=timezone.utc))
+
+        response = self.client.post(self.filter_url, {
+            "published_after": "2024-01-01T00:00:00Z",
+            "published_before": "2024-06-01T00:00:00Z",
+        }, format='json')
+        self.assertEqual(response.data["post_ids"], [old.id])
+
+        response = self.client.post(self.filter_url, {"published_before": "2025-01-01T00:00:00Z"}, format='json')
+        self.assertEqual(response.data["post_ids"], [new.id, old.id])
+
+    def test_filter_by_publication_date_seeks_index(self):
+        """Test pages within a publication date range are read from the publication date index"""
+        fetch_page = self._page_fetcher(
+            2, sort_by="DATE", published_after="2000-01-01T00:00:00Z", published_before="2100-01-01T00:00:00Z"
+        )
+        self.assertPagesSeekIndex(fetch_page, "blog_api_post_published_idx")
+
+    def test_sort_by_publication_date(self):
+        """Test backdated posts sort by publication date, not by id"""
+        backdated = models.Post.objects.create(profile=self.user.profile, title="Imported", content="",
+                                               published_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+        ids = self._fetch_all(2, sort_by="DATE")
+
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)] + [backdated.id])
+
+    def test_sort_by_hot(self):
+        """Test trending posts are sorted by their stored hot score"""
+        models.Post.objects.filter(pk=self.posts[1].pk).update(hot_score=10)
+        models.Post.objects.filter(pk=self.posts[3].pk).update(hot_score=5)
+
+        ids = self._fetch_all(2, sort_by="HOT")
+
+        self.assertEqual(ids[:2], [self.posts[1].id, self.posts[3].id])
+        self.assertEqual(sorted(ids), sorted(post.id for post in self.posts))
+
+    def test_sort_by_hot_pages_seek_index(self):
+        """Test pages sorted by hot score are read from the hot score index"""
+        self.assertPagesSeekIndex(self._page_fetcher(2, sort_by="HOT"), "blog_api_post_hot_idx")
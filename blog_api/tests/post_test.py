@@ -1,8 +1,12 @@
-from django.test import TestCase
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
 from blog_api import models
+from blog_api.tests.helpers import QueryPlanMixin, crafted_cursor
 
 
 class PostViewTests(TestCase):
@@ -72,10 +76,10 @@ class PostViewTests(TestCase):
         self.assertEqual(self.post.title, "Updated Title")
         self.assertEqual(self.post.content, "Updated content")
         
-        # Verify tags were updated
+        # Verify tags were updated and stored lowercase
         tag_values = [tag.value for tag in self.post.tags.all()]
-        self.assertIn("newTag", tag_values)
-        self.assertIn("anotherTag", tag_values)
+        self.assertIn("newtag", tag_values)
+        self.assertIn("anothertag", tag_values)
     
     def test_update_post_not_found(self):
         """Test updating non-existent post returns 404"""
@@ -195,15 +199,15 @@ class PostViewTests(TestCase):
             "title": "Updated Title",
             "content": "Updated content",
             "image": None,
-            "tags": ["brandNewTag", "anotherBrandNewTag"]
+            "tags": ["brandNewTag", "anotherBrandNewTag", "Django"]
         }
         response = self.client.put(self.post_url, update_data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        # Verify new tags were created
-        self.assertTrue(models.Hashtag.objects.filter(value="brandNewTag").exists())
-        self.assertTrue(models.Hashtag.objects.filter(value="anotherBrandNewTag").exists())
+        # Verify new tags were created, existing tags are reused regardless of case
+        self.assertTrue(models.Hashtag.objects.filter(value="brandnewtag").exists())
+        self.assertTrue(models.Hashtag.objects.filter(value="anotherbrandnewtag").exists())
         
         # Should have 2 more tags than before
         self.assertEqual(models.Hashtag.objects.count(), initial_tag_count + 2)
@@ -252,3 +256,362 @@ class PostViewTests(TestCase):
         # Verify no duplicate posts with same content were created
         posts_with_title = models.Post.objects.filter(title="New Post Title")
         self.assertEqual(posts_with_title.count(), 1)
+
+    def test_get_post_not_modified(self):
+        """Test a matching If-None-Match is answered with 304 without loading the post"""
+        response = self.client.get(self.post_url)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_get_post_etag_changes_on_mutation(self):
+        """Test edits, engagement and author changes invalidate the ETag of a post"""
+        self.client.force_authenticate(user=self.other_user)
+        etags = [self.client.get(self.post_url)["ETag"]]
+
+        self.client.post(f"/api/post/{self.post.id}/like/")
+        etags.append(self.client.get(self.post_url)["ETag"])
+
+        self.client.post(f"/api/post/{self.post.id}/comments/", {"content": "Nice"})
+        etags.append(self.client.get(self.post_url)["ETag"])
+
+        models.Post.objects.create(profile=self.user.profile, title="Another post")
+        etags.append(self.client.get(self.post_url)["ETag"])
+
+        self.post.title = "Edited"
+        self.post.save()
+        etags.append(self.client.get(self.post_url)["ETag"])
+
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_get_post_sparse_fields(self):
+        """Test `fields` also applies to cached posts and is part of the ETag"""
+        self.client.force_authenticate(user=self.other_user)
+        full = self.client.get(self.post_url)
+
+        response = self.client.get(self.post_url, {"fields": "id,is_liked,profile.user"}, HTTP_IF_NONE_MATCH=full["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            "id": self.post.id,
+            "is_liked": False,
+            "profile": {"user": {"id": self.user.id, "username": "testuser"}},
+        })
+
+    def test_get_post_etag_depends_on_viewer(self):
+        """Test viewers with different like/bookmark flags get different ETags"""
+        models.Like.objects.create(post=self.post, liker_profile=self.other_user.profile)
+        anonymous_etag = self.client.get(self.post_url)["ETag"]
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_liked"])
+
+
+class PostViewCacheTests(TestCase):
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpass123")
+        self.post = models.Post.objects.create(profile=self.user.profile, title="Test Post", content="Test content")
+        self.post_url = f"/api/post/by-id/{self.post.id}"
+
+    def test_cached_post_takes_one_query(self):
+        """Test a cached post is answered from a single lookup of its versions and the viewer's flags"""
+        self.client.force_authenticate(user=self.other_user)
+        expected = self.client.get(self.post_url).data
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.post_url)
+        self.assertEqual(response.data, expected)
+
+    def test_viewer_flags_are_overlaid(self):
+        """Test viewers sharing a cached post still get their own like/bookmark flags"""
+        models.Like.objects.create(post=self.post, liker_profile=self.other_user.profile)
+        self.assertFalse(self.client.get(self.post_url).data["is_liked"])
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertTrue(self.client.get(self.post_url).data["is_liked"])
+
+        self.client.force_authenticate(user=self.user)
+        self.assertFalse(self.client.get(self.post_url).data["is_liked"])
+
+    def test_cache_invalidated_on_change(self):
+        """Test engagement, tag and author changes are visible immediately"""
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.post_url)
+
+        self.client.post(f"/api/post/{self.post.id}/like/")
+        self.client.put(self.post_url, {"tags": ["Django"]}, format="json")
+        self.client.put(f"/api/user/by-id/{self.user.id}/profile", {"biography": "Updated"}, format="json")
+        draft = self.client.post("/api/drafts/").data["draft_post_id"]
+
+        response = self.client.get(self.post_url)
+        self.assertEqual(response.data["like_count"], 1)
+        self.assertTrue(response.data["is_liked"])
+        self.assertEqual(response.data["tags"], ["django"])
+        self.assertEqual(response.data["profile"]["biography"], "Updated")
+        self.assertEqual(response.data["profile"]["post_ids"], [self.post.id, draft])
+
+        self.post.tags.clear()
+        self.assertEqual(self.client.get(self.post_url).data["tags"], [])
+
+    def test_file_based_cache(self):
+        """Test the cache works with the file-based backend"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": directory,
+        }}):
+            expected = self.client.get(self.post_url).data
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(self.post_url).data, expected)
+
+            self.post.title = "Edited"
+            self.post.save()
+            self.assertEqual(self.client.get(self.post_url).data["title"], "Edited")
+
+
+class PostBatchViewTests(TestCase):
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpass123")
+
+        self.tag = models.Hashtag.objects.create(value="django")
+
+        self.first_post = models.Post.objects.create(profile=self.user.profile, title="First", content="")
+        self.second_post = models.Post.objects.create(profile=self.other_user.profile, title="Second", content="")
+        self.second_post.tags.set([self.tag])
+        self.draft = models.Post.objects.create(profile=self.user.profile, title="Draft", content="", draft=True)
+
+        self.batch_url = "/api/posts/batch"
+
+    def test_batch_preserves_request_order(self):
+        """Test posts are returned in the order of the requested IDs"""
+        ids = [self.second_post.id, self.first_post.id]
+        response = self.client.post(self.batch_url, {"ids": ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["posts"]], ids)
+        self.assertEqual(response.data["posts"][0]["post"]["title"], "Second")
+        self.assertEqual(response.data["posts"][0]["post"]["tags"], ["django"])
+        self.assertEqual(response.data["posts"][1]["post"]["title"], "First")
+
+    def test_batch_reports_missing_posts(self):
+        """Test non-existent IDs are reported per item"""
+        response = self.client.post(self.batch_url, {"ids": [999, self.first_post.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["posts"][0], {"id": 999, "error": "Post does not exist"})
+        self.assertEqual(response.data["posts"][1]["post"]["id"], self.first_post.id)
+
+    def test_batch_hides_drafts_of_other_users(self):
+        """Test drafts are only returned to their author"""
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.post(self.batch_url, {"ids": [self.draft.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("post", response.data["posts"][0])
+        self.assertIn("You can only view your own drafts", response.data["posts"][0]["error"])
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.batch_url, {"ids": [self.draft.id]}, format='json')
+
+        self.assertEqual(response.data["posts"][0]["post"]["title"], "Draft")
+
+    def test_batch_invalid_data(self):
+        """Test a request without an ID list is rejected"""
+        response = self.client.post(self.batch_url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_out_of_range_ids(self):
+        """Test IDs which cannot be stored in the database, and empty lists, are rejected"""
+        for ids in [[2 ** 63], [0], [-1], []]:
+            with self.subTest(ids=ids):
+                response = self.client.post(self.batch_url, {"ids": ids}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.batch_url, {"ids": [2 ** 63 - 1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("error", response.data["posts"][0])
+
+
+class PostListViewTests(QueryPlanMixin, TestCase):
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpass123")
+        self.tag = models.Hashtag.objects.create(value="django")
+
+        self.post = self._create_post(self.user)
+        models.Like.objects.create(post=self.post, liker_profile=self.other_user.profile)
+        models.Comment.objects.create(post=self.post, author_profile=self.other_user.profile, content="Nice")
+        models.Comment.objects.create(post=self.post, author_profile=self.user.profile, content="Thanks")
+        models.Bookmark.objects.create(post=self.post, creator_profile=self.other_user.profile)
+        models.Post.objects.filter(pk=self.post.pk).update(like_count=1, comment_count=2, bookmark_count=1)
+
+        self.posts_url = "/api/posts/"
+
+    def _create_post(self, user, **kwargs):
+        post = models.Post.objects.create(profile=user.profile, title="Test Post", content="Test content", **kwargs)
+        post.tags.set([self.tag])
+        return post
+
+    def test_list_excludes_drafts(self):
+        """Test drafts are not listed"""
+        self._create_post(self.user, draft=True)
+        response = self.client.get(self.posts_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post["id"] for post in response.data["results"]], [self.post.id])
+
+    def test_list_engagement_fields(self):
+        """Test counters and annotated viewer flags are serialized"""
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(self.posts_url)
+
+        post = response.data["results"][0]
+        self.assertEqual(post["like_count"], 1)
+        self.assertEqual(post["comment_count"], 2)
+        self.assertEqual(post["bookmark_count"], 1)
+        self.assertTrue(post["is_liked"])
+        self.assertTrue(post["is_bookmarked"])
+        self.assertEqual(post["tags"], ["django"])
+        self.assertEqual(post["profile"]["post_ids"], [self.post.id])
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.posts_url)
+
+        self.assertFalse(response.data["results"][0]["is_liked"])
+        self.assertFalse(response.data["results"][0]["is_bookmarked"])
+
+    def test_list_returns_summaries(self):
+        """Test listed posts carry the excerpt and reading time instead of the full content"""
+        response = self.client.get(self.posts_url)
+
+        post = response.data["results"][0]
+        self.assertNotIn("content", post)
+        self.assertEqual(post["excerpt"], "Test content")
+        self.assertEqual(post["word_count"], 2)
+        self.assertEqual(post["reading_time"], 1)
+
+        response = self.client.get(f"/api/post/by-id/{self.post.id}")
+        self.assertEqual(response.data["content"], "Test content")
+        self.assertNotIn("excerpt", response.data)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing posts takes the same number of queries regardless of the number of posts"""
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(4):
+            self.client.get(self.posts_url)
+
+        for user in [self.user, self.other_user, self.other_user]:
+            self._create_post(user)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.posts_url)
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_list_pagination(self):
+        """Test the list is paginated newest first by following the next cursor"""
+        posts = [self.post] + [self._create_post(self.user) for _ in range(4)]
+        expected = [post.id for post in reversed(posts)]
+
+        ids = []
+        cursor = None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get(self.posts_url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            ids += [post["id"] for post in response.data["results"]]
+            cursor = response.data["next"]
+            if cursor is None:
+                break
+
+        self.assertEqual(ids, expected)
+
+    def test_list_pages_seek_index(self):
+        """Test each page is read from the publication date index, without sorting all posts"""
+        for _ in range(4):
+            self._create_post(self.user)
+
+        def fetch_page(cursor):
+            return self.client.get(self.posts_url, {"limit": 2, **({"cursor": cursor} if cursor else {})}).data["next"]
+
+        self.assertPagesSeekIndex(fetch_page, "blog_api_post_published_idx")
+
+    def test_list_sparse_fields(self):
+        """Test `fields` limits the serialized posts and skips the queries of unselected fields"""
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.posts_url, {"fields": "id,title,profile.user.username,like_count"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{
+            "id": self.post.id,
+            "title": "Test Post",
+            "profile": {"user": {"username": "testuser"}},
+            "like_count": 1,
+        }])
+
+    def test_list_excluded_fields(self):
+        """Test `exclude` removes top-level and nested fields"""
+        response = self.client.get(self.posts_url, {"exclude": "excerpt,profile.post_ids,is_liked"})
+
+        post = response.data["results"][0]
+        self.assertNotIn("excerpt", post)
+        self.assertNotIn("is_liked", post)
+        self.assertNotIn("post_ids", post["profile"])
+        self.assertEqual(post["profile"]["user"]["username"], "testuser")
+        self.assertIn("is_bookmarked", post)
+
+    def test_list_unknown_fields(self):
+        """Test selecting fields which do not exist is rejected"""
+        response = self.client.get(self.posts_url, {"fields": "id,nonexistent"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.posts_url, {"fields": "title.length"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_invalid_pagination(self):
+        """Test malformed cursors and limits are rejected"""
+        response = self.client.get(self.posts_url, {"cursor": "not a cursor"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Invalid cursor", response.data["error"])
+
+        response = self.client.get(self.posts_url, {"limit": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_cursor_with_invalid_values(self):
+        """Test well-formed cursors whose values cannot be compared with posts are rejected"""
+        ordering = ["-published_at", "-id"]
+        for values in [[None, 1], ["2024-01-01T00:00:00+00:00", None], ["2024-01-01T00:00:00+00:00", 2 ** 63], ["yesterday", 1]]:
+            with self.subTest(values=values):
+                response = self.client.get(self.posts_url, {"cursor": crafted_cursor(ordering, values)})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("Invalid cursor", response.data["error"])
+
+    def test_list_not_modified(self):
+        """Test an unchanged page is answered with 304 and changes once one of its posts changes"""
+        etag = self.client.get(self.posts_url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.post.adjust_counter("like_count", 1)
+        response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["like_count"], 2)
+        self.assertNotEqual(response["ETag"], etag)
@@ -61,6 +61,34 @@ class ProfileViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["user"]["username"], "testuser")
     
+    def test_get_profile_not_modified(self):
+        """Test a matching If-None-Match is answered with 304 until the profile or its posts change"""
+        etag = self.client.get(self.profile_url)["ETag"]
+
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.post2.delete()
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["post_ids"], [self.post1.id])
+
+        self.client.force_authenticate(user=self.user)
+        self.client.put(self.profile_url, {"biography": "Updated"}, format="json")
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["biography"], "Updated")
+
+    def test_get_profile_sparse_fields(self):
+        """Test `fields` and `exclude` select the returned profile fields"""
+        response = self.client.get(self.profile_url, {"fields": "user.username,biography"})
+        self.assertEqual(response.data, {"user": {"username": "testuser"}, "biography": "Test biography"})
+
+        # User, profile version and profile, the post ids are not queried
+        with self.assertNumQueries(3):
+            response = self.client.get(self.profile_url, {"exclude": "post_ids"})
+        self.assertNotIn("post_ids", response.data)
+
     def test_update_profile_success(self):
         """Test updating a profile successfully"""
         self.client.login(username="testuser", password="testpass123")
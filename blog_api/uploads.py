@@ -0,0 +1,87 @@
+"""
+Validation of uploaded image bytes while they are streamed to the blob store.
+
+The declared type is checked against the magic bytes at the start of the content before the rest is
+read, and the upload is aborted as soon as it grows beyond `settings.IMAGE_MAX_UPLOAD_SIZE` bytes.
+"""
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+from django.conf import settings
+
+# Bytes read from the request body at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Image types of the `Content-Type`s accepted for raw uploads
+CONTENT_TYPES = {"image/png": "PNG", "image/jpeg": "JPEG", "image/svg+xml": "SVG"}
+
+# Bytes needed to recognize any of the types
+SNIFF_LENGTH = 256
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff(head: bytes) -> str | None:
+    """The image type recognized from the first bytes of the content, or `None`"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    # The root element of an SVG document may follow an XML declaration, comments or a doctype
+    text = head.removeprefix(b"\xef\xbb\xbf").lstrip()
+    if text.startswith((b"<svg", b"<?xml", b"<!--", b"<!DOCTYPE svg")):
+        return "SVG"
+    return None
+
+
+def check_length(content_length: int | None, overhead: float = 1, extra: int = 0):
+    """
+    Rejects a request before reading its body if its `Content-Length` exceeds the size limit,
+    allowing for the encoding `overhead` factor and `extra` bytes of the request format
+    """
+    if content_length and content_length > settings.IMAGE_MAX_UPLOAD_SIZE * overhead + extra:
+        raise too_large()
+
+
+def too_large() -> UploadError:
+    return UploadError(f"Image larger than {settings.IMAGE_MAX_UPLOAD_SIZE} bytes", 413)
+
+
+def read_chunks(stream: BinaryIO | None, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    if stream is None:
+        return
+    while chunk := stream.read(chunk_size):
+        yield chunk
+
+
+def validated(chunks: Iterable[bytes], type: str) -> Iterator[bytes]:
+    """
+    Passes on `chunks` while checking that they start like an image of `type` and stay within the size limit.
+    Raises `UploadError` as soon as either check fails, before the rest is read.
+    """
+    head = b""
+    size = 0
+    chunks = iter(chunks)
+    for chunk in chunks:
+        head += chunk
+        size += len(chunk)
+        if len(head) >= SNIFF_LENGTH:
+            break
+
+    if not head:
+        raise UploadError("Image is empty", 400)
+    if sniff(head) != type:
+        raise UploadError(f"Content is not a {type} image", 415)
+    if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise too_large()
+    yield head
+
+    for chunk in chunks:
+        size += len(chunk)
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise too_large()
+        yield chunk
@@ -24,4 +24,5 @@ urlpatterns = [
     path("drafts/", views.draft.DraftsView.as_view()),
     path("drafts/<int:draft_id>/publish/", views.draft.DraftPublishView.as_view()),  # POST (publish draft)
     path("posts/", views.post.PostListView.as_view()),  # List all posts
+    path("posts/batch", views.post.PostBatchView.as_view()),  # POST (retrieve multiple posts)
 ]
@@ -0,0 +1,241 @@
+"""
+Resized variants of images, generated on demand and kept in a bounded on-disk cache under
+`settings.IMAGE_VARIANT_ROOT`.
+
+Requested sizes are snapped up to `VARIANT_SIZES`, so each image has a small, fixed number of variants.
+Variants may also be converted to a more compact format accepted by the client, see `accepted_format`.
+Cache hits refresh the modification time of the file, and the least recently used variants are
+evicted once the cache grows beyond `settings.IMAGE_VARIANT_CACHE_SIZE` bytes. The size of the cache is
+tracked as variants are generated, so it is only scanned when it is full, see `evict`.
+Images which fail to decode get a marker in the cache, so requests for their variants do not occupy the
+worker pool again.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from django.conf import settings
+from django.http import QueryDict
+from PIL import UnidentifiedImageError
+
+from blog_api import imaging, models
+
+VARIANT_SIZES = (40, 80, 160, 320, 640, 1280, 1920)
+FITS = ("contain", "cover")
+
+
+class Variant(NamedTuple):
+    width: int | None
+    height: int | None
+    fit: str
+    # One of `imaging.DERIVATIVE_FORMATS`, or `None` for the format of the image
+    format: str | None = None
+
+    @property
+    def resized(self) -> bool:
+        return self.width is not None or self.height is not None
+
+
+def snap(size: int) -> int:
+    """The smallest variant size at least as large as `size`, or the largest variant size"""
+    return next((variant_size for variant_size in VARIANT_SIZES if variant_size >= size), VARIANT_SIZES[-1])
+
+
+def _parse_size(query_params: QueryDict, name: str) -> int | None:
+    value = query_params.get(name)
+    if not value:
+        return None
+    if not value.isdigit() or int(value) == 0:
+        raise ValueError(f"{name} must be a positive integer")
+    return snap(int(value))
+
+
+def from_query(query_params: QueryDict) -> Variant | None:
+    """
+    Reads the variant requested with the `w`, `h` and `fit` query parameters, `None` for the original.
+    Raises `ValueError` for invalid parameters.
+    """
+    width, height = _parse_size(query_params, "w"), _parse_size(query_params, "h")
+    fit = query_params.get("fit", "contain")
+    if fit not in FITS:
+        raise ValueError(f"fit must be one of: {', '.join(FITS)}")
+    if width is None and height is None:
+        return None
+    if fit == "cover" and (width is None or height is None):
+        raise ValueError("fit=cover requires both w and h")
+    return Variant(width, height, fit)
+
+
+def accepted_format(accept: str) -> str | None:
+    """
+    The preferred of `imaging.DERIVATIVE_FORMATS` which the `Accept` header explicitly accepts, or `None`.
+    Wildcards are not taken into account, clients which accept anything also accept the original format.
+    """
+    qualities = {}
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        qualities[media_type.strip().lower()] = quality
+    accepted = [format for format in imaging.DERIVATIVE_FORMATS if qualities.get(content_type(format), 0) > 0]
+    return accepted[0] if accepted else None
+
+
+def content_type(format: str) -> str:
+    return f"image/{format.lower()}"
+
+
+def _root() -> Path:
+    return Path(settings.IMAGE_VARIANT_ROOT)
+
+
+def _source(image: models.Image) -> str:
+    return image.sha256 or f"image-{image.id}"
+
+
+def _path(image: models.Image, variant: Variant) -> Path:
+    source = _source(image)
+    extension = (variant.format or image.type).lower()
+    name = f"{source}-{variant.width or 0}x{variant.height or 0}-{variant.fit}.{extension}"
+    return _root() / source[:2] / name
+
+
+def _invalid_marker(image: models.Image) -> Path:
+    """Empty file recording that the image does not decode, so that it is not decoded again for every variant"""
+    source = _source(image)
+    return _root() / source[:2] / f"{source}.invalid"
+
+
+_pending: dict[Path, Future] = {}
+_pending_lock = threading.Lock()
+
+# Eviction frees this fraction of the cache more than needed, so that the next variants do not fill it again
+EVICTION_HEADROOM = 0.1
+
+# Size in bytes of each cache root as of its last scan, plus the variants this process generated since.
+# Variants generated by other processes sharing the cache are only counted by the next scan
+_cache_sizes: dict[Path, int] = {}
+_cache_lock = threading.Lock()
+_eviction_lock = threading.Lock()
+
+
+def open_variant(image: models.Image, variant: Variant) -> BinaryIO | None:
+    """
+    Opens the variant of `image`, generating it in the worker pool unless it is cached.
+    Returns `None` for a variant in another format which would be larger than in the format of the image.
+    Raises one of `imaging.DECODE_ERRORS` if the image does not decode.
+    """
+    path = _path(image, variant)
+    generated = None
+    try:
+        # Opened first, so that the variant can still be read if another process evicts it
+        file = path.open("rb")
+    except FileNotFoundError:
+        if not image.valid or _invalid_marker(image).exists():
+            raise UnidentifiedImageError(f"Image {image.id} does not decode as {image.type}")
+        with _pending_lock:
+            # Concurrent requests for the same variant wait for a single generation
+            future = _pending.get(path)
+            if future is None:
+                # The source is opened here, since worker threads have no access to the request's transaction
+                future = imaging.executor().submit(
+                    _generate, path, image.open(), image.type, image.size, variant, _invalid_marker(image)
+                )
+                _pending[path] = generated = future
+        future.result()
+        file = path.open("rb")
+    else:
+        # Marks the variant as recently used
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+    if generated is not None:
+        # Only once the variant is open, it may be evicted right away from a cache smaller than a few variants
+        _added(generated.result())
+    if variant.format and os.fstat(file.fileno()).st_size == 0:
+        file.close()
+        return None
+    return file
+
+
+def _generate(path: Path, source: BinaryIO, type: str, size: int, variant: Variant, invalid_marker: Path) -> int:
+    try:
+        try:
+            image = imaging.load(source)
+        except imaging.DECODE_ERRORS:
+            invalid_marker.parent.mkdir(parents=True, exist_ok=True)
+            invalid_marker.touch()
+            raise
+        if variant.resized:
+            image = imaging.scale(image, variant.width, variant.height, variant.fit)
+        data = imaging.encode(image, variant.format or type)
+        if variant.format:
+            unconverted_size = len(imaging.encode(image, type)) if variant.resized else size
+            if len(data) >= unconverted_size:
+                # Cached as an empty file, the variant is served in the format of the image instead
+                data = b""
+
+        temp_dir = _root() / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, path)
+        return len(data)
+    finally:
+        with _pending_lock:
+            _pending.pop(path, None)
+
+
+def _added(size: int):
+    """Counts a generated variant of `size` bytes, evicting variants if the cache is full or was never scanned"""
+    root = _root()
+    with _cache_lock:
+        if root in _cache_sizes:
+            _cache_sizes[root] += size
+            if _cache_sizes[root] <= settings.IMAGE_VARIANT_CACHE_SIZE:
+                return
+    evict()
+
+
+def evict(max_size: int | None = None):
+    """
+    Deletes the least recently used variants until the cache is at most `max_size` bytes, by default
+    `EVICTION_HEADROOM` less than `settings.IMAGE_VARIANT_CACHE_SIZE`, and records the size of the cache.
+    Does nothing while another thread is evicting, variants deleted by another process are skipped.
+    """
+    if max_size is None:
+        max_size = int(settings.IMAGE_VARIANT_CACHE_SIZE * (1 - EVICTION_HEADROOM))
+    if not _eviction_lock.acquire(blocking=False):
+        return
+    try:
+        root = _root()
+        entries = []
+        if root.exists():
+            for directory in os.scandir(root):
+                if directory.is_dir() and directory.name != "tmp":
+                    for entry in os.scandir(directory.path):
+                        with contextlib.suppress(FileNotFoundError):
+                            if entry.is_file():
+                                stat = entry.stat()
+                                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= max_size:
+                break
+            Path(entry_path).unlink(missing_ok=True)
+            total -= size
+        with _cache_lock:
+            _cache_sizes[root] = total
+    finally:
+        _eviction_lock.release()
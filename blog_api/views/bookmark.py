@@ -1,7 +1,11 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from rest_framework import status, views, permissions
 
-from blog_api import models, serializers
+from blog_api import conditional, models, serializers
+from blog_api.fieldsets import FIELDSET_PARAMETERS, FieldSet
+from blog_api.streaming import stream_json_array
 
 
 class BookmarkPostView(views.APIView):
@@ -30,11 +34,14 @@ class BookmarkPostView(views.APIView):
                 {"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        bookmark, created = models.Bookmark.objects.get_or_create(
-            post=post,
-            creator_profile=request.user.profile,
-            defaults={"title": serializer.validated_data.get("title", "")},
-        )
+        with transaction.atomic():
+            bookmark, created = models.Bookmark.objects.get_or_create(
+                post=post,
+                creator_profile=request.user.profile,
+                defaults={"title": serializer.validated_data.get("title", "")},
+            )
+            if created:
+                post.adjust_counter("bookmark_count", 1)
         if not created:
             return views.Response(
                 {"error": "Post already bookmarked"},
@@ -86,9 +93,12 @@ class BookmarkPostView(views.APIView):
             return views.Response(
                 {"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        deleted, _ = models.Bookmark.objects.filter(
-            post=post, creator_profile=request.user.profile
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = models.Bookmark.objects.filter(
+                post=post, creator_profile=request.user.profile
+            ).delete()
+            if deleted:
+                post.adjust_counter("bookmark_count", -1)
         if not deleted:
             return views.Response(
                 {"error": "Bookmark not found"}, status=status.HTTP_404_NOT_FOUND
@@ -101,15 +111,47 @@ class BookmarkListView(views.APIView):
 
     @extend_schema(
         summary="List all bookmarks for the authenticated user",
-        description="Returns all bookmarks for the authenticated user.",
-        responses={200: serializers.BookmarkSerializer(many=True)},
+        description="Returns all bookmarks for the authenticated user, oldest first. The list is streamed while the bookmarks are read. The response carries an `ETag`, send it back in `If-None-Match` to get a `304 Not Modified` if the bookmarks have not changed. Use `fields` or `exclude` to return only some fields of the bookmarks.",
+        parameters=FIELDSET_PARAMETERS,
+        responses={
+            200: serializers.BookmarkSerializer(many=True),
+            304: OpenApiResponse(description="Bookmarks not modified"),
+        },
         tags=['Bookmarks'],
     )
     def get(self, request: views.Request):
+        fieldset = FieldSet.from_request(request, serializers.BookmarkSerializer)
+
         # Using the related manager (bookmark_set) from the profile
-        bookmarks = request.user.profile.bookmark_set.all()
-        serializer = serializers.BookmarkSerializer(bookmarks, many=True)
-        return views.Response(serializer.data)
+        bookmarks = request.user.profile.bookmark_set.order_by("id")
+
+        # Validates the whole list: adding, renaming or deleting a bookmark, or changing one of the posts,
+        # their authors or the viewer's profile, changes it. Bookmarks have no version, their title is included
+        versions = bookmarks.values_list("id", "title", "post__version", "post__profile__version")
+        etag = conditional.make_etag(
+            "bookmarks", request.user.id, request.user.profile.version, list(versions), fieldset.cache_key()
+        )
+        not_modified = conditional.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        if fieldset.includes("creator_profile"):
+            bookmarks = bookmarks.select_related(
+                "creator_profile__user" if fieldset.includes("creator_profile.user") else "creator_profile"
+            )
+            if fieldset.includes("creator_profile.post_ids"):
+                bookmarks = bookmarks.prefetch_related(Prefetch(
+                    "creator_profile__post_set", queryset=models.Post.objects.only("id", "profile_id").order_by("id")
+                ))
+        if fieldset.includes("post"):
+            bookmarks = bookmarks.prefetch_related(
+                Prefetch("post", queryset=models.Post.objects.for_serializer(fieldset=fieldset.nested("post"), summary=True))
+            )
+        response = stream_json_array(
+            bookmarks, lambda chunk: fieldset.prune(serializers.BookmarkSerializer(chunk, many=True)).data
+        )
+        response["ETag"] = etag
+        return response
 
 
 class BookmarkInstanceView(views.APIView):
@@ -173,5 +215,7 @@ class BookmarkInstanceView(views.APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        bookmark.delete()
+        with transaction.atomic():
+            bookmark.delete()
+            bookmark.post.adjust_counter("bookmark_count", -1)
         return views.Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,7 +1,10 @@
+from django.db import transaction
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework import status, views, permissions, serializers as drf_serializers
 
-from blog_api import models, serializers
+from blog_api import conditional, models, serializers
+from blog_api.fieldsets import FIELDSET_PARAMETERS, FieldSet
+from blog_api.pagination import InvalidCursor, paginate
 
 class CommentView(views.APIView):
     """Handles comment listing and creation for a specific post."""
@@ -9,22 +12,63 @@ class CommentView(views.APIView):
 
     @extend_schema(
         summary="List comments for a post",
-        description="Retrieve all comments for a specific post. Comments are returned with author information and timestamps.",
-        parameters=[OpenApiParameter("post_id", int, OpenApiParameter.PATH, description="Unique identifier of the post")],
+        description="Retrieve the comments of a specific post, oldest first unless `order` is `NEWEST`. Comments are returned with a summary of their author. Results are paginated, pass the returned `next` cursor to get the following page. Each page carries an `ETag`, send it back in `If-None-Match` to get a `304 Not Modified` if the page has not changed. Use `fields` or `exclude` to return only some fields of the comments.",
+        parameters=[
+            OpenApiParameter("post_id", int, OpenApiParameter.PATH, description="Unique identifier of the post"),
+            serializers.CommentPaginationSerializer,
+            *FIELDSET_PARAMETERS,
+        ],
         responses={
-            200: serializers.CommentSerializer(many=True),
+            200: serializers.CommentPageSerializer,
+            304: OpenApiResponse(description="Page not modified"),
+            400: OpenApiResponse(description="Invalid cursor"),
             404: OpenApiResponse(description="Post not found")
         }, 
         tags=['Comments']
     )
-    def get(self, _request: views.Request, post_id: int):
-        try:
-            post = models.Post.objects.get(pk=post_id)
-        except models.Post.DoesNotExist:
+    def get(self, request: views.Request, post_id: int):
+        pagination = serializers.CommentPaginationSerializer(data=request.query_params)
+        pagination.is_valid(raise_exception=True)
+        fieldset = FieldSet.from_request(request, serializers.CommentSerializer)
+        if not models.Post.objects.filter(pk=post_id).exists():
             return views.Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
-        comments = models.Comment.objects.filter(post=post)
-        serializer = serializers.CommentSerializer(comments, many=True)
-        return views.Response(serializer.data)
+
+        # A page is a range scan on the (post, id) index, loaded with its authors in a single query
+        comments = models.Comment.objects.filter(post_id=post_id)
+        if fieldset.includes("author_profile"):
+            comments = comments.select_related("author_profile__user").defer("author_profile__biography")
+        if not fieldset.includes("content"):
+            comments = comments.defer("content")
+        order = pagination.validated_data["order"]
+        try:
+            page, next_cursor = paginate(
+                comments, ["-id" if order == serializers.CommentOrder.NEWEST.value else "id"],
+                pagination.validated_data["limit"], pagination.validated_data.get("cursor")
+            )
+        except InvalidCursor:
+            return views.Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Editing or deleting a comment of the page, or changing what the summary of an author shows, changes the page.
+        # Not the version of the authors, which also changes with their biography and posts
+        etag = conditional.make_etag(
+            "comments", post_id, order,
+            [
+                (comment.id, comment.version, *(
+                    (comment.author_profile.user.username, comment.author_profile.profile_picture_id)
+                    if fieldset.includes("author_profile") else ()
+                ))
+                for comment in page
+            ],
+            next_cursor, fieldset.cache_key(),
+        )
+        not_modified = conditional.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = fieldset.prune(serializers.CommentSerializer(page, many=True))
+        response = views.Response({"results": serializer.data, "next": next_cursor})
+        response["ETag"] = etag
+        return response
 
     @extend_schema(
         summary="Create a comment",
@@ -45,11 +89,13 @@ class CommentView(views.APIView):
             return views.Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
         serializer = serializers.CommentCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        comment = models.Comment.objects.create(
-            post=post,
-            author_profile=request.user.profile,
-            content=serializer.validated_data["content"]
-        )
+        with transaction.atomic():
+            comment = models.Comment.objects.create(
+                post=post,
+                author_profile=request.user.profile,
+                content=serializer.validated_data["content"]
+            )
+            post.adjust_counter("comment_count", 1)
         return views.Response(serializers.CommentSerializer(comment).data, status=status.HTTP_201_CREATED)
 
 class CommentInstanceView(views.APIView):
@@ -109,5 +155,7 @@ class CommentInstanceView(views.APIView):
             return views.Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
         if comment.author_profile != request.user.profile:
             return views.Response({"error": "You can only delete your own comments"}, status=status.HTTP_403_FORBIDDEN)
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            comment.post.adjust_counter("comment_count", -1)
         return views.Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
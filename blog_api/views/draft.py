@@ -41,7 +41,7 @@ class DraftPublishView(views.APIView):
         description="Convert a draft post to a published post, making it visible to all users. Only the draft owner can publish their drafts.",
         parameters=[OpenApiParameter("draft_id", int, OpenApiParameter.PATH, description="Unique identifier of the draft")],
         responses={
-            200: serializers.PostSerializer,
+            200: serializers.PostSummarySerializer,
             404: OpenApiResponse(description="Draft not found or not owned by user")
         },
         tags=['Drafts']
@@ -51,7 +51,6 @@ class DraftPublishView(views.APIView):
             draft = request.user.profile.post_set.get(id=draft_id, draft=True)
         except models.Post.DoesNotExist:
             return views.Response({'detail': 'Draft not found'}, status=status.HTTP_404_NOT_FOUND)
-        draft.draft = False
-        draft.save()
-        serializer = serializers.PostSerializer(draft)
+        draft.publish()
+        serializer = serializers.PostSummarySerializer(draft)
         return views.Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,40 +1,158 @@
-from io import BytesIO
 import base64
+from typing import BinaryIO
 
-from django.http import FileResponse
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework import views, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework import status
 from rest_framework.response import Response
 
-from blog_api import models
+from blog_api import conditional, imaging, models, processing, ranges, uploads, variants
+
+# Images are never modified after upload, so clients may keep them as long as they like
+IMAGE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def image_etag(image: models.Image, variant: variants.Variant | None = None) -> str:
+    """The content hash, or for images still stored in the database their id, which never changes"""
+    if variant is not None:
+        return conditional.make_etag("image", image.sha256 or image.id, *variant)
+    if image.sha256:
+        return quote_etag(image.sha256)
+    return conditional.make_etag("image", image.id)
+
+
+class ImageContentNegotiation(DefaultContentNegotiation):
+    """The image view negotiates the image format itself, its errors are returned as JSON whatever is accepted"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def negotiates_content(view):
+    view.content_negotiation_class = ImageContentNegotiation
+    return view
+
+
+def cache_forever(response: HttpResponse, etag: str, negotiated: bool = False) -> HttpResponse:
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=IMAGE_MAX_AGE, immutable=True)
+    if negotiated:
+        patch_vary_headers(response, ["Accept"])
+    return response
 
 
 @extend_schema(
     summary="Retrieve an image",
-    description="Get an image file by its ID. Returns the image in its original format (PNG, JPEG, or SVG).",
-    parameters=[OpenApiParameter("id", int, OpenApiParameter.PATH, description="Unique identifier of the image")],
+    description="Get an image file by its ID. Returns the image in its original format (PNG, JPEG, or SVG), streamed from the blob store. "
+                "With w and/or h a scaled down variant is returned instead, sizes are rounded up to one of "
+                f"{', '.join(map(str, variants.VARIANT_SIZES))} pixels. SVG images are always returned as they are. "
+                "PNG and JPEG images are converted to AVIF or WebP when the Accept header lists them explicitly, "
+                "unless the converted image would be larger. "
+                "Images never change, so responses may be cached indefinitely and revalidated with If-None-Match. "
+                "Byte ranges can be requested with Range, and If-Range is validated against the ETag.",
+    parameters=[
+        OpenApiParameter("id", int, OpenApiParameter.PATH, description="Unique identifier of the image"),
+        OpenApiParameter("w", int, description="Maximum width of the returned image"),
+        OpenApiParameter("h", int, description="Maximum height of the returned image"),
+        OpenApiParameter(
+            "fit", str, enum=variants.FITS, default="contain",
+            description="contain: fit within w x h keeping the aspect ratio, cover: fill w x h and crop"
+        ),
+    ],
     responses={
         200: OpenApiResponse(description="Image file returned"),
-        404: OpenApiResponse(description="Image not found")
+        206: OpenApiResponse(description="Byte ranges of the image requested with Range, as multipart/byteranges for several ranges"),
+        304: OpenApiResponse(description="Image not modified since the ETag in If-None-Match"),
+        400: OpenApiResponse(description="Invalid variant parameters"),
+        404: OpenApiResponse(description="Image not found"),
+        416: OpenApiResponse(description="None of the ranges requested with Range is within the image"),
     }, 
     tags=['Images']
 )
 @api_view(["GET"])
-def image(_request: views.Request, id: int):
+@negotiates_content
+def image(request: views.Request, id: int):
     try:
+        # Only the metadata, bytes still stored in the database are read once they are actually sent
         image: models.Image = models.Image.objects.get(pk=id)
     except models.Image.DoesNotExist:
         return views.Response(status=views.status.HTTP_404_NOT_FOUND)
 
-    return FileResponse(BytesIO(image.data), content_type=f"image/{image.type}")
+    try:
+        variant = variants.from_query(request.query_params)
+    except ValueError as e:
+        return views.Response({"error": str(e)}, status=views.status.HTTP_400_BAD_REQUEST)
+    # Raster images are converted to a more compact format if the client accepts one
+    negotiated = image.type in imaging.PIL_FORMATS
+    if not negotiated:
+        variant = None
+    elif accepted := variants.accepted_format(request.headers.get("Accept", "")):
+        variant = (variant or variants.Variant(None, None, "contain"))._replace(format=accepted)
+
+    etag = image_etag(image, variant)
+    not_modified = conditional.not_modified(request, etag)
+    if not_modified is not None:
+        return cache_forever(not_modified, etag, negotiated)
+
+    try:
+        file, content_type = _open_image(image, variant)
+    except FileNotFoundError:
+        # Processing replaced the blob with optimized bytes since the image was loaded, those are sent instead
+        image.refresh_from_db(fields=["sha256", "size"])
+        etag = image_etag(image, variant)
+        file, content_type = _open_image(image, variant)
+
+    # Served from the open file, servers can send it with `sendfile` without copying it through Python
+    # and only the requested ranges are read for Range requests
+    return cache_forever(ranges.file_response(request, file, content_type, etag), etag, negotiated)
+
+
+def _open_image(image: models.Image, variant: variants.Variant | None) -> tuple[BinaryIO, str]:
+    """Opens the variant of the image, or the image itself, and returns it with its content type"""
+    file = None
+    content_type = image.content_type
+    if variant is not None:
+        try:
+            file = variants.open_variant(image, variant)
+            if file is not None and variant.format:
+                content_type = variants.content_type(variant.format)
+            elif file is None and variant.resized:
+                # Converting the variant would make it larger
+                file = variants.open_variant(image, variant._replace(format=None))
+        except imaging.DECODE_ERRORS:
+            # Not a valid image, returned as it was uploaded
+            pass
+    if file is None:
+        file = image.open()
+    return file, content_type
 
 
 @extend_schema(
     summary="Upload an image",
-    description="Upload a new image file. Accepts base64-encoded image data for PNG, JPEG, or SVG formats. Returns the image ID for use in posts or profiles.",
+    description="Upload a new image file in PNG, JPEG, or SVG format. Returns the image ID for use in posts or profiles. "
+                "Uploading content identical to an existing image of the same type returns the ID of that image.\n\n"
+                "The image can be sent as the raw request body with its Content-Type (image/png, image/jpeg or image/svg+xml), "
+                "as the file field of a multipart form, or base64-encoded in JSON. "
+                "The content must match the image type and be at most IMAGE_MAX_UPLOAD_SIZE bytes.",
     request={
+        **{content_type: {"type": "string", "format": "binary"} for content_type in uploads.CONTENT_TYPES},
+        "multipart/form-data": {
+            "type": "object",
+            "properties": {
+                "file": {"type": "string", "format": "binary", "description": "Image file"},
+                "type": {
+                    "type": "string",
+                    "enum": ["PNG", "JPEG", "SVG"],
+                    "description": "Image format type, by default taken from the Content-Type of the file"
+                },
+            },
+            "required": ["file"]
+        },
         "application/json": {
             "schema": {
                 "type": "object",
@@ -59,7 +177,9 @@ def image(_request: views.Request, id: int):
             description="Image uploaded successfully"
         ),
         400: OpenApiResponse(description="Invalid input data or unsupported image type"),
-        401: OpenApiResponse(description="Authentication required")
+        401: OpenApiResponse(description="Authentication required"),
+        413: OpenApiResponse(description="Image too large"),
+        415: OpenApiResponse(description="Content does not match the image type"),
     }, 
     tags=['Images']
 )
@@ -67,26 +187,45 @@ def image(_request: views.Request, id: int):
 @permission_classes([permissions.IsAuthenticated])
 def upload_image(request: views.Request):
     """Upload a new image"""
+    content_type = request.content_type.split(";")[0].strip().lower()
+    content_length = int(request.META.get("CONTENT_LENGTH") or 0)
     try:
-        img_type = request.data.get('type')
-        img_data_b64 = request.data.get('data')
-        
-        if not img_type or not img_data_b64:
-            return Response({'error': 'type and data fields required'}, status=status.HTTP_400_BAD_REQUEST)
-        
+        if content_type in uploads.CONTENT_TYPES:
+            # Streamed from the request body to the blob store, without holding the whole image in memory
+            uploads.check_length(content_length)
+            img_type = uploads.CONTENT_TYPES[content_type]
+            chunks = uploads.read_chunks(request.stream)
+        elif content_type == "multipart/form-data":
+            # Django spools large files to a temporary file while parsing the form
+            uploads.check_length(content_length, extra=uploads.UPLOAD_CHUNK_SIZE)
+            file = request.data.get('file')
+            if file is None:
+                return Response({'error': 'file field required'}, status=status.HTTP_400_BAD_REQUEST)
+            img_type = request.data.get('type') or uploads.CONTENT_TYPES.get(file.content_type)
+            chunks = file.chunks(uploads.UPLOAD_CHUNK_SIZE)
+        else:
+            uploads.check_length(content_length, overhead=4 / 3, extra=uploads.UPLOAD_CHUNK_SIZE)
+            img_type = request.data.get('type')
+            img_data_b64 = request.data.get('data')
+
+            if not img_type or not img_data_b64:
+                return Response({'error': 'type and data fields required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Decode base64 data
+            chunks = [base64.b64decode(img_data_b64)]
+
         if img_type not in ['PNG', 'JPEG', 'SVG']:
             return Response({'error': 'Invalid image type'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Decode base64 data
-        img_data = base64.b64decode(img_data_b64)
-        
-        # Create image record
-        image = models.Image.objects.create(
-            type=img_type,
-            data=img_data
-        )
-        
+
+        # Write the bytes to the blob store and create the image record
+        image = models.Image.objects.store(img_type, uploads.validated(chunks, img_type))
+        # Verified and optimized in the background, the ID can be used right away
+        if not image.processed:
+            processing.schedule(image.id)
+
         return Response({'id': image.id}, status=status.HTTP_201_CREATED)
-        
+
+    except uploads.UploadError as e:
+        return Response({'error': str(e)}, status=e.status)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,4 @@
+from django.db import transaction
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from rest_framework import status, views, permissions
 from blog_api import models
@@ -21,12 +22,14 @@ class LikeView(views.APIView):
         try:
             post = models.Post.objects.get(pk=post_id)
         except models.Post.DoesNotExist:
-            return views.Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)        
-        like = models.Like.objects.filter(post=post, liker_profile=request.user.profile).first()
-        if like:
-            like.delete()
-            return views.Response(status=status.HTTP_200_OK)
-        models.Like.objects.create(post=post, liker_profile=request.user.profile)
+            return views.Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            deleted, _ = models.Like.objects.filter(post=post, liker_profile=request.user.profile).delete()
+            if deleted:
+                post.adjust_counter("like_count", -1)
+                return views.Response(status=status.HTTP_200_OK)
+            models.Like.objects.create(post=post, liker_profile=request.user.profile)
+            post.adjust_counter("like_count", 1)
         return views.Response(status=status.HTTP_201_CREATED)
 
     @extend_schema(
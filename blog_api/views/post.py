@@ -2,7 +2,16 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
 from rest_framework import permissions, status, views
 from rest_framework.response import Response
 
-from blog_api import models, serializers
+from blog_api import conditional, models, post_cache, serializers
+from blog_api.fieldsets import FIELDSET_PARAMETERS, FieldSet
+from blog_api.pagination import InvalidCursor, paginate
+
+
+def post_etag(request, post_id: int, version: int, profile_version: int, fieldset: FieldSet) -> str:
+    # Any like or bookmark bumps the post version, so together with the viewer it determines their flags
+    return conditional.make_etag(
+        "post", post_id, version, profile_version, conditional.viewer_key(request), fieldset.cache_key()
+    )
 
 
 class PostListView(views.APIView):
@@ -10,16 +19,88 @@ class PostListView(views.APIView):
 
     @extend_schema(
         summary="List all published posts",
-        description="Retrieve a list of all published blog posts. Draft posts are excluded from this list. Posts include engagement metrics like likes, comments, and bookmarks.",
+        description="Retrieve a list of all published blog posts, newest first. Draft posts are excluded from this list. Posts include engagement metrics like likes, comments, and bookmarks. Posts are summarized with an excerpt instead of their full content. Results are paginated, pass the returned `next` cursor to get the following page. Each page carries an `ETag` for conditional requests with `If-None-Match`. Use `fields` or `exclude` to return only some fields of the posts.",
+        parameters=[serializers.PaginationSerializer, *FIELDSET_PARAMETERS],
         responses={
-            200: serializers.PostSerializer(many=True)
+            200: serializers.PostPageSerializer,
+            304: OpenApiResponse(description="Page not modified"),
+            400: OpenApiResponse(description="Invalid cursor")
         }, 
         tags=['Posts']
     )
     def get(self, request):
-        posts = models.Post.objects.filter(draft=False)
-        serializer = serializers.PostSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data)
+        pagination = serializers.PaginationSerializer(data=request.query_params)
+        pagination.is_valid(raise_exception=True)
+        fieldset = FieldSet.from_request(request, serializers.PostSummarySerializer)
+
+        # The page is first resolved to the versions of its posts, which validate the whole page
+        keys = models.Post.objects.filter(draft=False).select_related("profile") \
+            .only("id", "published_at", "version", "profile__version")
+        try:
+            page, next_cursor = paginate(
+                keys, ["-published_at", "-id"], pagination.validated_data["limit"], pagination.validated_data.get("cursor")
+            )
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = conditional.make_etag(
+            "posts", [(post.id, post.version, post.profile.version) for post in page], next_cursor,
+            conditional.viewer_key(request), fieldset.cache_key(),
+        )
+        not_modified = conditional.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        posts = models.Post.objects.filter(pk__in=[post.id for post in page]) \
+            .order_by("-published_at", "-id").for_serializer(request.user, fieldset, summary=True)
+        serializer = fieldset.prune(serializers.PostSummarySerializer(posts, many=True, context={'request': request}))
+        response = Response({"results": serializer.data, "next": next_cursor})
+        response["ETag"] = etag
+        return response
+
+
+class PostBatchView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        summary="Retrieve multiple posts",
+        description="Get the summaries of several posts in one request, with an excerpt instead of the full content. Results are returned in the order of the requested IDs. Posts that do not exist, or drafts of other users, are reported with an error instead of the post. Use `fields` or `exclude` to return only some fields of the posts.",
+        parameters=FIELDSET_PARAMETERS,
+        request=serializers.PostBatchSerializer,
+        responses={
+            200: serializers.PostBatchResponseSerializer
+        },
+        tags=['Posts']
+    )
+    def post(self, request: views.Request):
+        serializer = serializers.PostBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fieldset = FieldSet.from_request(request, serializers.PostSummarySerializer)
+
+        ids: list[int] = serializer.validated_data["ids"]
+        posts = models.Post.objects.filter(pk__in=ids).for_serializer(request.user, fieldset, summary=True)
+        posts_by_id = {post.id: post for post in posts}
+
+        # Compared by id, the author may not be loaded
+        has_drafts = any(post.draft for post in posts_by_id.values())
+        viewer_profile_id = request.user.profile.id if has_drafts and request.user.is_authenticated else None
+        visible = [
+            post for post in posts_by_id.values()
+            if not post.draft or post.profile_id == viewer_profile_id
+        ]
+        serialized = fieldset.prune(serializers.PostSummarySerializer(visible, many=True, context={'request': request})).data
+        serialized_by_id = {post.id: data for post, data in zip(visible, serialized)}
+
+        items = []
+        for post_id in ids:
+            if post_id in serialized_by_id:
+                items.append({"id": post_id, "post": serialized_by_id[post_id]})
+            elif post_id in posts_by_id:
+                items.append({"id": post_id, "error": "You can only view your own drafts"})
+            else:
+                items.append({"id": post_id, "error": "Post does not exist"})
+
+        return views.Response({"posts": items})
 
 
 class PostView(views.APIView):
@@ -27,24 +108,55 @@ class PostView(views.APIView):
 
     @extend_schema(
         summary="Retrieve a post",
-        description="Get the details of a specific post by its ID. This includes the post's content, title, and engagement metrics.",
-        parameters=[OpenApiParameter("post_id", int, OpenApiParameter.PATH, description="Unique identifier of the post")],
+        description="Get the details of a specific post by its ID. This includes the post's content, title, and engagement metrics. The response carries an `ETag`, send it back in `If-None-Match` to get a `304 Not Modified` if the post has not changed. Use `fields` or `exclude` to return only some fields.",
+        parameters=[
+            OpenApiParameter("post_id", int, OpenApiParameter.PATH, description="Unique identifier of the post"),
+            *FIELDSET_PARAMETERS,
+        ],
         responses={
             200: serializers.PostSerializer,
+            304: OpenApiResponse(description="Post not modified"),
             404: OpenApiResponse(description="Post not found")
         },
         tags=['Posts']
     )
     def get(self, request: views.Request, post_id: int):
-        try:
-            post = models.Post.objects.get(pk=post_id)
-        except models.Post.DoesNotExist:
+        fieldset = FieldSet.from_request(request, serializers.PostSerializer)
+        flags = [flag for flag in models.VIEWER_FLAGS if fieldset.includes(flag)] if request.user.is_authenticated else []
+
+        # One query for everything needed to answer from the ETag or the cache
+        row = models.Post.objects.filter(pk=post_id).with_viewer_flags(request.user, flags) \
+            .values("version", "profile__version", *flags).first()
+        if row is None:
             return views.Response({
                 "error": "Post does not exist"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = serializers.PostSerializer(post, context={'request': request})
-        return views.Response(serializer.data)
+        versions = (row["version"], row["profile__version"])
+        not_modified = conditional.not_modified(request, post_etag(request, post_id, *versions, fieldset))
+        if not_modified is not None:
+            return not_modified
+
+        data = post_cache.lookup(post_id, *versions)
+        if data is None:
+            try:
+                post = models.Post.objects.for_serializer().get(pk=post_id)
+            except models.Post.DoesNotExist:
+                return views.Response({
+                    "error": "Post does not exist"
+                }, status=status.HTTP_404_NOT_FOUND)
+            # Serialized without a viewer, their flags are overlaid below
+            data = serializers.PostSerializer(post).data
+            post_cache.store(post, data)
+            versions = (post.version, post.profile.version)
+
+        response = views.Response(fieldset.apply({
+            **data,
+            "is_liked": row.get("is_liked", False),
+            "is_bookmarked": row.get("is_bookmarked", False),
+        }))
+        response["ETag"] = post_etag(request, post_id, *versions, fieldset)
+        return response
 
     @extend_schema(
         summary="Update a post",
@@ -83,7 +195,7 @@ class PostView(views.APIView):
         
         if tags_data is not None: # Check if tags were part of the update
             tags = [
-                models.Hashtag.objects.get_or_create(value=tag)[0]
+                models.Hashtag.objects.get_or_create(value=models.Hashtag.normalize(tag))[0]
                 for tag in tags_data
             ]
             post.tags.set(tags)
@@ -124,8 +236,7 @@ class PostView(views.APIView):
                 "error": "You can only publish your own drafts"
             }, status=status.HTTP_403_FORBIDDEN)
 
-        post.draft = False
-        post.save()
+        post.publish()
 
         return views.Response()
 
@@ -1,8 +1,8 @@
-from django.db.models import Q, Count
 from drf_spectacular.utils import extend_schema, OpenApiResponse
-from rest_framework import views, permissions
+from rest_framework import views, permissions, status
 
 from blog_api import models, serializers
+from blog_api.pagination import InvalidCursor, paginate
 
 
 class PostFilterView(views.APIView):
@@ -15,16 +15,20 @@ class PostFilterView(views.APIView):
         
         - **author_id**: Filter by specific user ID
         - **author_name**: Filter by username (case-insensitive)
+        - **published_after** / **published_before**: Filter by publication date
         - **tags**: Filter by hashtags (all specified tags must be present)
         - **keywords**: Search in title and content (any keyword match)
-        - **sort_by**: Sort results by date (newest first) or popularity (most liked first)
+        - **sort_by**: Sort results by date (newest first), popularity (most liked first), trending (most recent engagement first) or relevance to the keywords (best match first)
         
         All filters are combined with AND logic, except keywords which use OR logic.
         Only published posts are included in results.
+
+        Results are paginated: at most **limit** IDs are returned, pass the returned **next** cursor to get the following page.
         """,
         request=serializers.PostFilterSerializer, 
         responses={
-            200: serializers.PostListSerializer
+            200: serializers.PostListSerializer,
+            400: OpenApiResponse(description="Invalid cursor")
         }, 
         tags=['Filters']
     )
@@ -40,22 +44,44 @@ class PostFilterView(views.APIView):
         if serializer.validated_data.get("author_name") is not None:
             queryset = queryset.filter(profile__user__username__iexact=serializer.validated_data["author_name"])
 
-        for tag in serializer.validated_data["tags"]:
-            queryset = queryset.filter(tags__value__iexact=tag)
+        if serializer.validated_data.get("published_after") is not None:
+            queryset = queryset.filter(published_at__gte=serializer.validated_data["published_after"])
 
-        for keyword in serializer.validated_data["keywords"]:
-            queryset = queryset.filter(Q(title__icontains=keyword) | Q(content__icontains=keyword))
-        
-        queryset = queryset.distinct()
+        if serializer.validated_data.get("published_before") is not None:
+            queryset = queryset.filter(published_at__lt=serializer.validated_data["published_before"])
+
+        queryset = queryset.with_all_tags(serializer.validated_data["tags"])
+
+        queryset = queryset.search(serializer.validated_data["keywords"])
 
         sort_by = serializer.validated_data["sort_by"]
         if sort_by == serializers.PostSortingMethod.DATE.value:
-            queryset = queryset.order_by("-id")
+            ordering = ["-published_at", "-id"]
         elif sort_by == serializers.PostSortingMethod.LIKES.value:
-            queryset = queryset.annotate(like_count=Count("like")).order_by("-like_count")
+            ordering = ["-like_count", "-id"]
+        elif sort_by == serializers.PostSortingMethod.HOT.value:
+            ordering = ["-hot_score", "-id"]
+        elif sort_by == serializers.PostSortingMethod.RELEVANCE.value:
+            # Only keywords matched by the full-text index are ranked
+            if "search_rank" in queryset.query.annotations:
+                ordering = ["search_rank", "-id"]
+            else:
+                ordering = ["-published_at", "-id"]
+
+        queryset = queryset.only(*[
+            field.lstrip("-") for field in ordering if field.lstrip("-") not in queryset.query.annotations
+        ])
 
-        queryset = queryset.values_list("id", flat=True)
+        try:
+            posts, next_cursor = paginate(
+                queryset, ordering, serializer.validated_data["limit"], serializer.validated_data.get("cursor")
+            )
+        except InvalidCursor:
+            return views.Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
 
-        list_serializer = serializers.PostListSerializer({ "post_ids": queryset })
+        list_serializer = serializers.PostListSerializer({
+            "post_ids": [post.id for post in posts],
+            "next": next_cursor,
+        })
 
         return views.Response(list_serializer.data)
@@ -3,27 +3,42 @@ from rest_framework import status, views
 from rest_framework import permissions
 from rest_framework.decorators import api_view, permission_classes
 
-from blog_api import models, serializers
+from blog_api import conditional, models, serializers
+from blog_api.fieldsets import FIELDSET_PARAMETERS, FieldSet
 
 class ProfileView(views.APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     @extend_schema(
         summary="Get user profile",
-        description="Retrieve profile information for a specific user including biography and profile picture.",
-        parameters=[OpenApiParameter("user_id", int, OpenApiParameter.PATH, description="Unique identifier of the user")],
+        description="Retrieve profile information for a specific user including biography and profile picture. The response carries an `ETag`, send it back in `If-None-Match` to get a `304 Not Modified` if the profile has not changed. Use `fields` or `exclude` to return only some fields.",
+        parameters=[
+            OpenApiParameter("user_id", int, OpenApiParameter.PATH, description="Unique identifier of the user"),
+            *FIELDSET_PARAMETERS,
+        ],
         responses={
             200: serializers.ProfileSerializer,
+            304: OpenApiResponse(description="Profile not modified"),
             404: OpenApiResponse(description="User not found")
         }, 
         tags=['Profiles']
     )
-    def get(self, _request: views.Request, user_id: int):
+    def get(self, request: views.Request, user_id: int):
+        fieldset = FieldSet.from_request(request, serializers.ProfileSerializer)
         try:
             user = models.User.objects.get(pk=user_id)
+            version = models.Profile.objects.values_list("version", flat=True).get(user=user)
+            etag = conditional.make_etag("profile", user_id, version, fieldset.cache_key())
+            not_modified = conditional.not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+
             profile = models.Profile.objects.get(user=user)
-            serializer = serializers.ProfileSerializer(profile)
-            return views.Response(serializer.data)
+            profile.user = user
+            serializer = fieldset.prune(serializers.ProfileSerializer(profile))
+            response = views.Response(serializer.data)
+            response["ETag"] = conditional.make_etag("profile", user_id, profile.version, fieldset.cache_key())
+            return response
         except models.User.DoesNotExist:
             return views.Response({
                 "error": "User not found"
@@ -21,6 +21,7 @@
               pytest-cov
               coverage
               django-cors-headers
+              pillow
             ]))
               nodejs
           ];
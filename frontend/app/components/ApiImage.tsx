@@ -1,5 +1,13 @@
+export interface ImageVariant {
+  w?: number;
+  h?: number;
+  fit?: "contain" | "cover";
+}
+
 export interface ApiImageProps {
   id?: number | null;
+  // Size of the image to request, by default the width and height when both are numbers
+  variant?: ImageVariant;
   fallback?: string,
   alt?: string;
   width?: number | string;
@@ -9,16 +17,23 @@ export interface ApiImageProps {
   onClick?: () => void;
 }
 
-export function getImageSrc(image_id?: number | null): string | null {
-  if (image_id) {
-    return `/api/image/${image_id}`
-  } else {
+export function getImageSrc(image_id?: number | null, variant?: ImageVariant): string | null {
+  if (!image_id) {
     return null
   }
+  // The server rounds sizes up to a fixed set of variants, so it only scales down each image a few times
+  const scale = typeof window === "undefined" ? 1 : window.devicePixelRatio || 1;
+  const params = new URLSearchParams();
+  if (variant?.w) params.set("w", String(Math.ceil(variant.w * scale)));
+  if (variant?.h) params.set("h", String(Math.ceil(variant.h * scale)));
+  if (variant?.fit && params.has("w") && params.has("h")) params.set("fit", variant.fit);
+  const query = params.toString();
+  return query ? `/api/image/${image_id}?${query}` : `/api/image/${image_id}`
 }
 
 export const ApiImage: React.FC<ApiImageProps> = ({
   id,
+  variant,
   fallback,
   alt,
   width,
@@ -27,9 +42,12 @@ export const ApiImage: React.FC<ApiImageProps> = ({
   style = {},
   onClick,
 }) => {
+  if (!variant && typeof width === "number" && typeof height === "number") {
+    variant = { w: width, h: height, fit: "cover" };
+  }
   return (
     <img
-      src={getImageSrc(id) || fallback}
+      src={getImageSrc(id, variant) || fallback}
       alt={alt}
       width={width}
       height={height}
@@ -26,12 +26,23 @@ interface Post {
   is_bookmarked: boolean;
 }
 
+interface CommentAuthor {
+  id: number;
+  username: string;
+  profile_picture: number | null;
+}
+
 interface Comment {
   id: number;
-  author_profile: Profile;
+  author_profile: CommentAuthor;
   content: string;
 }
 
+interface CommentPage {
+  results: Comment[];
+  next: string | null;
+}
+
 const API_BASE = '/api';
 
 // Accept id as a prop injected by @react-router/dev
@@ -40,6 +51,8 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
   const auth = useAuth();
   const [post, setPost] = useState<Post | null>(null);
   const [comments, setComments] = useState<Comment[]>([]);
+  const [nextCommentCursor, setNextCommentCursor] = useState<string | null>(null);
+  const [loadingMoreComments, setLoadingMoreComments] = useState(false);
   const [commentText, setCommentText] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -64,8 +77,9 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
         setPost(postData);
 
         if (commentsRes.ok) {
-          const commentsData = await commentsRes.json();
-          setComments(commentsData);
+          const commentsData: CommentPage = await commentsRes.json();
+          setComments(commentsData.results);
+          setNextCommentCursor(commentsData.next);
         }
       } catch (err) {
         setError(err instanceof Error ? err.message : 'An error occurred');
@@ -104,17 +118,41 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
       .finally(() => setBookmarkLoading(false));
   };
 
+  const fetchComments = async (cursor: string | null = null) => {
+    const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const res = await fetch(`${API_BASE}/post/${id}/comments/${params}`);
+    if (!res.ok) return;
+    const page: CommentPage = await res.json();
+    // Comments posted since the first page was loaded are already shown
+    setComments(previous => cursor
+      ? [...previous, ...page.results.filter(comment => !previous.some(shown => shown.id === comment.id))]
+      : page.results);
+    setNextCommentCursor(page.next);
+  };
+
+  const loadMoreComments = async () => {
+    setLoadingMoreComments(true);
+    try {
+      await fetchComments(nextCommentCursor);
+    } finally {
+      setLoadingMoreComments(false);
+    }
+  };
+
   const handleComment = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!commentText.trim()) return;
-    await makeAuthenticatedRequest(`${API_BASE}/post/${id}/comments/`, {
+    const res = await makeAuthenticatedRequest(`${API_BASE}/post/${id}/comments/`, {
       method: 'POST',
       credentials: 'include',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ content: commentText })
     });
+    if (!res.ok) return;
     setCommentText('');
-    fetch(`${API_BASE}/post/${id}/comments/`).then(res => res.json()).then(setComments);
+    // Appended to the comments shown, reloading the first page would miss it on posts with several pages
+    const comment: Comment = await res.json();
+    setComments(previous => [...previous, comment]);
     fetch(`${API_BASE}/post/by-id/${id}`).then(res => res.json()).then(setPost);
   };
 
@@ -179,7 +217,7 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
           <div className="post-author">
             <div className="author-avatar">
               {post.profile.profile_picture ? (
-                <ProfilePicture id={post.profile.profile_picture} />
+                <ProfilePicture id={post.profile.profile_picture} width={50} height={50} />
               ) : (
                 <div className="avatar-placeholder">
                   {post.profile.user.username.charAt(0).toUpperCase()}
@@ -336,24 +374,24 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
                 <div className="comment-author">
                   <div className="comment-avatar">
                     {comment.author_profile.profile_picture ? (
-                      <ProfilePicture id={comment.author_profile.profile_picture} />
+                      <ProfilePicture id={comment.author_profile.profile_picture} width={40} height={40} />
                     ) : (
                       <div className="avatar-placeholder">
-                        {comment.author_profile.user.username.charAt(0).toUpperCase()}
+                        {comment.author_profile.username.charAt(0).toUpperCase()}
                       </div>
                     )}
                   </div>
                   <div className="comment-details">
                     <strong 
                       className="comment-username"
-                      onClick={() => navigate(`/user/${comment.author_profile.user.id}`)}
+                      onClick={() => navigate(`/user/${comment.author_profile.id}`)}
                       style={{ 
                         cursor: 'pointer', 
                         textDecoration: 'underline',
                         color: '#0d6efd'
                       }}
                     >
-                      {comment.author_profile.user.username}
+                      {comment.author_profile.username}
                     </strong>
                     <p className="comment-content">{comment.content}</p>
                   </div>
@@ -362,6 +400,11 @@ const PostDetail: React.FC<{ id: string }> = ({ id }) => {
             ))
           )}
         </div>
+        {nextCommentCursor && (
+          <button className="comment-submit" onClick={loadMoreComments} disabled={loadingMoreComments}>
+            {loadingMoreComments ? 'Loading...' : 'Load more comments'}
+          </button>
+        )}
       </section>
     </div>
   );
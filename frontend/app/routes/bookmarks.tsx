@@ -9,10 +9,10 @@ import Button from "react-bootstrap/Button";
 import LoadingSpinner from "../components/LoadingSpinner";
 import { useNavigate } from "react-router";
 import { PostCard } from "~/components/Card";
-import type { Post, Profile } from "~/types/api";
+import type { PostSummary, Profile } from "~/types/api";
 interface Bookmark {
   id: number,
-  post: Post,
+  post: PostSummary,
   creator_profile: Profile,
   title: string,
 }
@@ -1,7 +1,8 @@
 import React, { useEffect, useState } from "react";
 import { useAuth } from "../contexts/AuthContext";
-import type { Post } from "../types/api";
+import type { PostSummary } from "../types/api";
 import { makeAuthenticatedRequest } from "../utils/auth";
+import { fetchPostsByIds } from "../utils/post";
 import Container from "react-bootstrap/Container";
 import Row from "react-bootstrap/Row";
 import Col from "react-bootstrap/Col";
@@ -14,7 +15,7 @@ import { PostCard } from "~/components/Card";
 const DraftsPage: React.FC = () => {
   const { isAuthenticated, user, isLoading } = useAuth();
   const navigate = useNavigate();
-  const [drafts, setDrafts] = useState<Post[]>([]);
+  const [drafts, setDrafts] = useState<PostSummary[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -45,19 +46,8 @@ const DraftsPage: React.FC = () => {
           return;
         }
 
-        // Fetch each draft's details
-        const draftPromises = draftIds.map(async (id: number) => {
-          const draftResponse = await makeAuthenticatedRequest(`/api/post/by-id/${id}`);
-          if (!draftResponse.ok) {
-            console.warn(`Failed to fetch draft ${id}`);
-            return null;
-          }
-          return await draftResponse.json();
-        });
-
-        const draftResults = await Promise.all(draftPromises);
-        const validDrafts = draftResults.filter((draft): draft is Post => draft !== null);
-        setDrafts(validDrafts);
+        // Fetch all drafts' details at once
+        setDrafts(await fetchPostsByIds(draftIds));
       } catch (err: any) {
         setError(err.message || "Failed to load drafts");
       } finally {
@@ -3,9 +3,10 @@ import { useState, useEffect } from "react";
 import { PostCard } from "~/components/Card";
 import { TagInput } from "~/components/TagInput";
 import { Container, Row, Col, Form, Button, InputGroup } from "react-bootstrap";
-import type { Post, PostFilter } from "~/types/api";
+import type { PostFilter, PostFilterResponse, PostSummary } from "~/types/api";
 import { PostSortingMethod } from "~/types/api";
 import { makeAuthenticatedRequest } from "~/utils/auth";
+import { fetchPostsByIds } from "~/utils/post";
 import { useSearchParams } from "react-router";
 
 export function meta({ }: Route.MetaArgs) {
@@ -19,8 +20,10 @@ export default function Home() {
   const [queryParams, _setQueryParams] = useSearchParams()
   const querySearch = queryParams.get("search")
 
-  const [posts, setPosts] = useState<Post[]>([]);
+  const [posts, setPosts] = useState<PostSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   let [keywordFilter, setKeywordFilter] = useState<string[]>([])
   const [authorFilter, setAuthorFilter] = useState("");
@@ -37,9 +40,13 @@ export default function Home() {
 
   }, [keywordFilter])
 
-  const fetchPosts = async () => {
+  const fetchPosts = async (cursor: string | null = null) => {
     try {
-      setLoading(true);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
 
       const response = await makeAuthenticatedRequest("/api/filter/", {
         method: 'POST',
@@ -49,26 +56,22 @@ export default function Home() {
           ...( keywordFilter.length !== 0 ? { keywords: keywordFilter } : {} ),
           ...( tagsFilter.length !== 0 ? { tags: tagsFilter } : {} ),
           ...( authorFilter ? { author_name: authorFilter } : {} ),
+          cursor,
         })
       });
       if (!response.ok) {
         throw new Error('Failed to fetch posts');
       }
-      let data = await response.json();
-
-      data = await Promise.all(data.post_ids.map(async (id: number) => {
-        const response = await fetch(`/api/post/by-id/${id}`);
-        if (!response.ok) {
-          throw new Error('Failed to fetch posts');
-        }
-        return await response.json();
-      }))
+      const data: PostFilterResponse = await response.json();
+      const page = await fetchPostsByIds(data.post_ids);
 
-      setPosts(data);
+      setPosts(cursor ? [...posts, ...page] : page);
+      setNextCursor(data.next);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -144,7 +147,9 @@ export default function Home() {
                     onChange={(e) => setSortBy(e.target.value as PostSortingMethod)}
                   >
                     <option value={PostSortingMethod.DATE}>Newest</option>
+                    <option value={PostSortingMethod.HOT}>Trending</option>
                     <option value={PostSortingMethod.LIKES}>Popular</option>
+                    <option value={PostSortingMethod.RELEVANCE}>Relevance</option>
                   </Form.Select>
                 </Form.Group>
               </Col>
@@ -178,6 +183,14 @@ export default function Home() {
           ))
         )}
       </Row>
+
+      {nextCursor && (
+        <div className="text-center mt-4">
+          <Button variant="outline-primary" onClick={() => fetchPosts(nextCursor)} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </Button>
+        </div>
+      )}
     </Container>
   );
 }
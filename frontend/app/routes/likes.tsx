@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useAuth } from "../contexts/AuthContext";
-import type { Post } from "../types/api";
+import type { PostPage, PostSummary } from "../types/api";
 import { makeAuthenticatedRequest } from "../utils/auth";
 import Container from "react-bootstrap/Container";
 import Row from "react-bootstrap/Row";
@@ -14,7 +14,7 @@ import { PostCard } from "~/components/Card";
 const LikesPage: React.FC = () => {
   const { isAuthenticated, user, isLoading } = useAuth();
   const navigate = useNavigate();
-  const [likedPosts, setLikedPosts] = useState<Post[]>([]);
+  const [likedPosts, setLikedPosts] = useState<PostSummary[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -33,10 +33,19 @@ const LikesPage: React.FC = () => {
       setError(null);
       setLoading(true);
       try {
-        const response = await makeAuthenticatedRequest("/api/posts/");
-        if (!response.ok) throw new Error("Failed to fetch posts");
-        
-        const allPosts: Post[] = await response.json();
+        // Walk through all pages of posts
+        const allPosts: PostSummary[] = [];
+        let cursor: string | null = null;
+        do {
+          const params = new URLSearchParams({ limit: "100", ...(cursor ? { cursor } : {}) });
+          const response = await makeAuthenticatedRequest(`/api/posts/?${params}`);
+          if (!response.ok) throw new Error("Failed to fetch posts");
+
+          const page: PostPage = await response.json();
+          allPosts.push(...page.results);
+          cursor = page.next;
+        } while (cursor);
+
         // Filter only posts that are liked by the current user
         const liked = allPosts.filter(post => post.is_liked);
         setLikedPosts(liked);
@@ -1,7 +1,8 @@
 import React, { useEffect, useState, useRef } from "react";
 import { useAuth } from "../contexts/AuthContext";
-import type { Profile, Post } from "../types/api";
+import type { Profile, PostSummary } from "../types/api";
 import { makeAuthenticatedRequest } from "../utils/auth";
+import { fetchPostsByIds } from "../utils/post";
 import Card from "react-bootstrap/Card";
 import Button from "react-bootstrap/Button";
 import Form from "react-bootstrap/Form";
@@ -28,7 +29,7 @@ const formatErrorMessage = (error: any): string => {
 const ProfileView: React.FC = () => {
   const { isAuthenticated } = useAuth();
   const [profile, setProfile] = useState<Profile | null>(null);
-  const [posts, setPosts] = useState<Post[]>([]);
+  const [posts, setPosts] = useState<PostSummary[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [editBio, setEditBio] = useState("");
@@ -57,14 +58,9 @@ const ProfileView: React.FC = () => {
         
         // Fetch posts if available
         if (prof.post_ids?.length > 0) {
-          const postsData: Post[] = await Promise.all(
-            prof.post_ids.map(async (id: number) => {
-              const res = await makeAuthenticatedRequest(`/api/post/by-id/${id}`);
-              return res.ok ? await res.json() : null;
-            })
-          );
+          const postsData = await fetchPostsByIds(prof.post_ids);
           // Filter out drafts - only show published posts in profile
-          setPosts(postsData.filter(post => post && !post.draft));
+          setPosts(postsData.filter(post => !post.draft));
         } else {
           setPosts([]);
         }
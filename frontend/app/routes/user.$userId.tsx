@@ -1,8 +1,9 @@
 import React, { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router";
 import { useAuth } from "../contexts/AuthContext";
-import type { Profile, Post } from "../types/api";
+import type { Profile, PostSummary } from "../types/api";
 import { makeAuthenticatedRequest } from "../utils/auth";
+import { fetchPostsByIds } from "../utils/post";
 import Card from "react-bootstrap/Card";
 import Button from "react-bootstrap/Button";
 import Container from "react-bootstrap/Container";
@@ -17,7 +18,7 @@ const UserProfileView: React.FC = () => {
   const { isAuthenticated, user } = useAuth();
   const navigate = useNavigate();
   const [profile, setProfile] = useState<Profile | null>(null);
-  const [posts, setPosts] = useState<Post[]>([]);
+  const [posts, setPosts] = useState<PostSummary[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -51,14 +52,9 @@ const UserProfileView: React.FC = () => {
         
         // Fetch posts if available
         if (prof.post_ids?.length > 0) {
-          const postsData: Post[] = await Promise.all(
-            prof.post_ids.map(async (id: number) => {
-              const res = await makeAuthenticatedRequest(`/api/post/by-id/${id}`);
-              return res.ok ? await res.json() : null;
-            })
-          );
+          const postsData = await fetchPostsByIds(prof.post_ids);
           // Only show published posts (not drafts) for other users
-          setPosts(postsData.filter(post => post && !post.draft));
+          setPosts(postsData.filter(post => !post.draft));
         } else {
           setPosts([]);
         }
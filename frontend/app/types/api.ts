@@ -10,11 +10,12 @@ export interface Profile {
   post_ids: number[];
 }
 
-export interface Post {
+interface PostBase {
   id: number;
   profile: Profile;
   title: string;
-  content: string;
+  word_count: number;
+  reading_time: number;
   image: number | null;
   tags: string[];
   like_count: number;
@@ -23,18 +24,51 @@ export interface Post {
   is_liked: boolean;
   is_bookmarked: boolean;
   draft: boolean;
+  created_at: string;
+  updated_at: string;
+  published_at: string | null;
+}
+
+export interface Post extends PostBase {
+  content: string;
+}
+
+// Compact representation returned by lists, with a plain text excerpt instead of the content
+export interface PostSummary extends PostBase {
+  excerpt: string;
+}
+
+export interface PostBatchItem {
+  id: number;
+  post?: PostSummary;
+  error?: string;
+}
+
+export interface PostBatchResponse {
+  posts: PostBatchItem[];
+}
+
+export interface CommentAuthor {
+  id: number;
+  username: string;
+  profile_picture: number | null;
 }
 
 export interface Comment {
   id: number;
-  post: Post;
-  author_profile: Profile;
+  post: number;
+  author_profile: CommentAuthor;
   content: string;
 }
 
+export interface CommentPage {
+  results: Comment[];
+  next: string | null;
+}
+
 export interface Bookmark {
   id: number;
-  post: Post;
+  post: PostSummary;
   creator_profile: Profile;
   title: string;
 }
@@ -43,17 +77,29 @@ export interface Bookmark {
 // Filter and search 
 export enum PostSortingMethod {
   DATE = "DATE",
-  LIKES = "LIKES"
+  LIKES = "LIKES",
+  RELEVANCE = "RELEVANCE",
+  HOT = "HOT"
 }
 
 export interface PostFilter {
   author_id?: number;
   author_name?: string;
+  published_after?: string;
+  published_before?: string;
   keywords: string[];
   tags: string[];
   sort_by: PostSortingMethod;
+  limit?: number;
+  cursor?: string | null;
 }
 
 export interface PostFilterResponse {
   post_ids: number[];
+  next: string | null;
+}
+
+export interface PostPage {
+  results: PostSummary[];
+  next: string | null;
 }
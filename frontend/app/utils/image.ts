@@ -1,28 +1,15 @@
 import { makeAuthenticatedRequest } from "./auth";
 
-// Helper functions
-const fileToBase64 = async (file: File): Promise<string> => {
-  const buffer = await file.arrayBuffer();
-  const base64url: string = await new Promise(resolve => {
-    const reader = new FileReader();
-    reader.onload = () => resolve(reader.result as string);
-    reader.readAsDataURL(new Blob([buffer]));
-  });
-  return base64url.slice(base64url.indexOf(',') + 1);
-};
-
 export async function handleImageUpload(e: React.ChangeEvent<HTMLInputElement>) {
   const file = e.target.files?.[0];
   if (!file) return;
 
   try {
-    const base64Data = await fileToBase64(file);
-    const fileType = file.type.split("/")[1].toUpperCase();
-
+    // Sent as the raw request body, which the server streams to storage
     const response = await makeAuthenticatedRequest("/api/image/", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ type: fileType, data: base64Data }),
+      headers: { "Content-Type": file.type },
+      body: file,
     });
 
     if (response.ok) {
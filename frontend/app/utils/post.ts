@@ -0,0 +1,38 @@
+import type { PostBatchResponse, PostSummary } from "~/types/api";
+import { makeAuthenticatedRequest } from "./auth";
+
+// Maximum number of IDs accepted by the batch endpoint per request
+const BATCH_SIZE = 100;
+
+/**
+ * Fetch several posts with as few requests as possible, in batches of at most `BATCH_SIZE` IDs.
+ * Posts which could not be retrieved are skipped, the order of `ids` is kept.
+ */
+export async function fetchPostsByIds(ids: number[]): Promise<PostSummary[]> {
+  const batches: number[][] = [];
+  for (let start = 0; start < ids.length; start += BATCH_SIZE) {
+    batches.push(ids.slice(start, start + BATCH_SIZE));
+  }
+  const pages = await Promise.all(batches.map(fetchBatch));
+  return pages.flat();
+}
+
+async function fetchBatch(ids: number[]): Promise<PostSummary[]> {
+  const response = await makeAuthenticatedRequest("/api/posts/batch", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ids }),
+  });
+  if (!response.ok) {
+    throw new Error("Failed to fetch posts");
+  }
+
+  const data: PostBatchResponse = await response.json();
+  return data.posts.flatMap(item => {
+    if (!item.post) {
+      console.warn(`Failed to fetch post ${item.id}: ${item.error}`);
+      return [];
+    }
+    return [item.post];
+  });
+}